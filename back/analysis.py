@@ -1,84 +1,391 @@
 # analysis.py
 
+import threading
 import numpy as np
 import pandas as pd
-from datetime import timedelta, datetime, time
+from datetime import time
+from functools import lru_cache
+
+# Missing temperature codes and stages in a ScheduleTable
+NO_CODE = -1
+# Missing moments in a ScheduleTable (the int64 value of NaT)
+NAT_NS = np.iinfo(np.int64).min
+
+
+class ScheduleTable:
+    """
+    Columnar table of schedules passed between the pipeline steps instead of
+    a DataFrame. Temperatures are int16 codes into the sorted `temperatures`
+    axis and stages are int16; development and switch times stay float64
+    because they are returned unrounded. Start, end and switch moments are
+    int64 nanoseconds (NAT_NS when missing), set by calculate_start_times and
+    calculate_end_times. segments holds the segment lists of multi-switch
+    schedules (None for other rows) or is None when there are none.
+    to_frame() gives the DataFrame layout the pipeline used before.
+    """
+    __slots__ = ('temperatures', 'switch', 'stage', 'temperature', 'temp1', 'temp2', 'switch_stage',
+                 'development_time', 'switch_hours', 'segments', 'start_ns', 'end_ns', 'switch_ns')
+
+    def __init__(self, temperatures, switch, stage, temperature, temp1, temp2, switch_stage, development_time,
+                 switch_hours, segments=None, start_ns=None, end_ns=None, switch_ns=None):
+        self.temperatures = temperatures
+        self.switch = switch
+        self.stage = stage
+        self.temperature = temperature
+        self.temp1 = temp1
+        self.temp2 = temp2
+        self.switch_stage = switch_stage
+        self.development_time = development_time
+        self.switch_hours = switch_hours
+        self.segments = segments
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.switch_ns = switch_ns
+
+    def __len__(self):
+        return len(self.stage)
+
+    @classmethod
+    def from_columns(cls, switch, stage, temperature, temp1=None, temp2=None, switch_stage=None,
+                     development_time=None, switch_hours=None, segments=None):
+        """
+        Builds a table from plain columns; temperatures are float values (NaN
+        when missing) and switch stages NaN or negative when missing.
+        """
+        n = len(stage)
+        missing = np.full(n, np.nan)
+        temperature = np.asarray(temperature, dtype=float)
+        temp1 = missing if temp1 is None else np.asarray(temp1, dtype=float)
+        temp2 = missing if temp2 is None else np.asarray(temp2, dtype=float)
+        values = np.concatenate([temperature, temp1, temp2])
+        axis = np.unique(values[~np.isnan(values)])
+        switch_stage = missing if switch_stage is None else np.asarray(switch_stage, dtype=float)
+        return cls(
+            axis,
+            np.broadcast_to(np.asarray(switch, dtype=bool), n).copy(),
+            np.asarray(stage).astype(np.int16),
+            temperature_codes(axis, temperature),
+            temperature_codes(axis, temp1),
+            temperature_codes(axis, temp2),
+            np.where(np.isnan(switch_stage), NO_CODE, switch_stage).astype(np.int16),
+            np.asarray(development_time, dtype=float),
+            missing if switch_hours is None else np.asarray(switch_hours, dtype=float),
+            segments,
+        )
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Builds a table from a DataFrame in the calculate_switch_times layout
+        (only Temperature, Stage and Development_Time are required).
+        """
+        def column(name):
+            return df[name].to_numpy(dtype=float) if name in df.columns else None
+
+        table = cls.from_columns(
+            df['Switch'].to_numpy(dtype=bool) if 'Switch' in df.columns else False,
+            df['Stage'].to_numpy(dtype=float).astype(int),
+            column('Temperature'),
+            temp1=column('Temp1'),
+            temp2=column('Temp2'),
+            switch_stage=column('Switch_Stage'),
+            development_time=column('Development_Time'),
+            switch_hours=column('Switch_Times'),
+            segments=df['Segments'].to_numpy(dtype=object) if 'Segments' in df.columns else None,
+        )
+        if 'Start_Time' in df.columns or 'End_Time' in df.columns:
+            table.start_ns, table.end_ns, table.switch_ns = (
+                frame_moments(df, name) for name in ('Start_Time', 'End_Time', 'Exact_Switch_Time')
+            )
+        return table
+
+    @classmethod
+    def concat(cls, tables):
+        """
+        Stacks tables row-wise on their merged temperature axis. Moments are
+        kept only if every table has them.
+        """
+        axis = np.unique(np.concatenate([table.temperatures for table in tables]))
+
+        def recode(table, codes):
+            mapping = np.append(np.searchsorted(axis, table.temperatures), NO_CODE)
+            return mapping[codes].astype(np.int16)
+
+        def stack(name):
+            return np.concatenate([getattr(table, name) for table in tables])
+
+        segments = None
+        if any(table.segments is not None for table in tables):
+            segments = np.concatenate([
+                table.segments if table.segments is not None else np.full(len(table), None, dtype=object)
+                for table in tables
+            ])
+        combined = cls(
+            axis, stack('switch'), stack('stage'),
+            np.concatenate([recode(table, table.temperature) for table in tables]),
+            np.concatenate([recode(table, table.temp1) for table in tables]),
+            np.concatenate([recode(table, table.temp2) for table in tables]),
+            stack('switch_stage'), stack('development_time'), stack('switch_hours'), segments,
+        )
+        if all(table.start_ns is not None for table in tables):
+            combined.start_ns, combined.end_ns, combined.switch_ns = (
+                stack('start_ns'), stack('end_ns'), stack('switch_ns')
+            )
+        return combined
+
+    def take(self, index):
+        """
+        Returns a new table with the rows selected by a boolean mask or positions.
+        """
+        def pick(values):
+            return None if values is None else values[index]
+
+        return ScheduleTable(
+            self.temperatures, self.switch[index], self.stage[index], self.temperature[index],
+            self.temp1[index], self.temp2[index], self.switch_stage[index], self.development_time[index],
+            self.switch_hours[index], pick(self.segments), pick(self.start_ns), pick(self.end_ns),
+            pick(self.switch_ns),
+        )
+
+    def with_moments(self, start_ns, end_ns, switch_ns):
+        """
+        Returns a table sharing these columns with the given moments set.
+        """
+        return ScheduleTable(
+            self.temperatures, self.switch, self.stage, self.temperature, self.temp1, self.temp2,
+            self.switch_stage, self.development_time, self.switch_hours, self.segments,
+            start_ns, end_ns, switch_ns,
+        )
+
+    def temperature_values(self, codes):
+        return np.append(self.temperatures, np.nan)[codes]
+
+    def to_frame(self):
+        """
+        The table as a DataFrame with the column names and types of the
+        former DataFrame pipeline; moments become datetime64[us] columns.
+        """
+        switch_stage = self.switch_stage.astype(float)
+        switch_stage[self.switch_stage == NO_CODE] = np.nan
+        columns = {
+            'Temperature': self.temperature_values(self.temperature),
+            'Stage': self.stage.astype(np.int64),
+            'Development_Time': self.development_time,
+            'Switch': self.switch,
+            'Temp1': self.temperature_values(self.temp1),
+            'Temp2': self.temperature_values(self.temp2),
+            'Switch_Stage': switch_stage,
+            'Switch_Times': self.switch_hours,
+        }
+        if self.segments is not None:
+            columns['Switch_Count'] = [
+                len(segments) - 1 if isinstance(segments, list) else np.nan for segments in self.segments
+            ]
+            columns['Segments'] = self.segments
+        if self.start_ns is not None:
+            for name, moments in (('Start_Time', self.start_ns), ('End_Time', self.end_ns),
+                                  ('Exact_Switch_Time', self.switch_ns)):
+                columns[name] = np.asarray(moments, dtype=np.int64).view('datetime64[ns]').astype('datetime64[us]')
+        return pd.DataFrame(columns)
+
+
+class LazyGrid:
+    """
+    Development times on (temperature, stage) cells, evaluated on demand.
+    cells() hands the cells it has not seen before to
+    evaluate(temperatures, stages) in one batch and memoizes the results per
+    temperature, so any temperature (26.5, 23.3, ...) can be asked for
+    without building a full temperature x stage mesh first. load(temperatures),
+    if given, returns already known (temperature, stage, development_time)
+    rows, such as the stored grid, that are used before evaluating. Stages
+    run 0..max_stage; cells outside that range are NaN. Once max_temperatures
+    temperatures are memoized the memo starts over.
+    """
+    def __init__(self, evaluate, max_stage, load=None, max_temperatures=4096):
+        self.evaluate = evaluate
+        self.max_stage = max_stage
+        self.load = load
+        self.max_temperatures = max_temperatures
+        self.evaluated_cells = 0
+        self._values = {}
+        self._known = {}
+        self._lock = threading.Lock()
+
+    def cells(self, temperatures, stages):
+        """
+        Returns the [temperature, stage] array of development times.
+        """
+        temperatures = [float(t) for t in temperatures]
+        stages = np.asarray(stages, dtype=int)
+        in_range = (stages >= 0) & (stages <= self.max_stage)
+        columns = stages[in_range]
+        wanted_columns = np.unique(columns)
+
+        with self._lock:
+            new_temperatures = [t for t in dict.fromkeys(temperatures) if t not in self._values]
+            if len(self._values) + len(new_temperatures) > self.max_temperatures:
+                self._values.clear()
+                self._known.clear()
+                new_temperatures = list(dict.fromkeys(temperatures))
+            for temperature in new_temperatures:
+                self._values[temperature] = np.full(self.max_stage + 1, np.nan)
+                self._known[temperature] = np.zeros(self.max_stage + 1, dtype=bool)
+            if new_temperatures and self.load is not None:
+                for temperature, stage, development_time in self.load(new_temperatures):
+                    if temperature in self._values and 0 <= stage <= self.max_stage:
+                        self._values[temperature][int(stage)] = development_time
+                        self._known[temperature][int(stage)] = True
+
+            # Evaluate every cell not known yet in one call
+            missing_temps, missing_stages = [], []
+            for temperature in dict.fromkeys(temperatures):
+                missing = wanted_columns[~self._known[temperature][wanted_columns]]
+                missing_temps.extend([temperature] * len(missing))
+                missing_stages.extend(missing.tolist())
+            if missing_temps:
+                values = np.asarray(self.evaluate(np.array(missing_temps), np.array(missing_stages)), dtype=float)
+                # Negative development times are set to zero, as in create_interpolated_dataset
+                values = np.where(values < 0, 0, values)
+                for temperature, stage, value in zip(missing_temps, missing_stages, values.tolist()):
+                    self._values[temperature][stage] = value
+                    self._known[temperature][stage] = True
+                self.evaluated_cells += len(missing_temps)
+
+            result = np.full((len(temperatures), len(stages)), np.nan)
+            if len(temperatures):
+                result[:, in_range] = np.array([self._values[t][columns] for t in temperatures])
+        return result
+
+    def frame(self, temperatures, stages=None):
+        """
+        The cells of the sorted unique temperatures and stages (default all
+        stages) in the interpolated DataFrame layout of create_interpolated_dataset.
+        """
+        temperatures = np.array(sorted(set(float(t) for t in temperatures)), dtype=float)
+        if stages is None:
+            stages = np.arange(self.max_stage + 1)
+        else:
+            stages = np.array(sorted(set(int(s) for s in stages if 0 <= s <= self.max_stage)), dtype=int)
+        values = self.cells(temperatures, stages)
+
+        temp_mesh, stage_mesh = np.meshgrid(temperatures, stages, indexing='ij')
+        df = pd.DataFrame({
+            'Temperature': temp_mesh.ravel(),
+            'Stage': stage_mesh.ravel().astype(np.int64),
+            'Development_Time': values.ravel(),
+        })
+        df['Switch'] = False
+        return df
+
+
+# Function to map temperature values onto the codes of a sorted axis (NaN becomes NO_CODE)
+def temperature_codes(axis, values):
+    missing = np.isnan(values)
+    positions = np.searchsorted(axis, np.where(missing, 0.0, values))
+    return np.where(missing, NO_CODE, positions).astype(np.int16)
+
+
+# Function to read a datetime column as int64 nanoseconds (NaT and a missing column become NAT_NS)
+def frame_moments(df, name):
+    if name not in df.columns:
+        return np.full(len(df), NAT_NS, dtype=np.int64)
+    return pd.to_datetime(df[name]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+# Function to accept either a ScheduleTable or a DataFrame in the calculate_switch_times layout
+def as_schedule_table(data):
+    return data if isinstance(data, ScheduleTable) else ScheduleTable.from_frame(data)
+
+
+# Function to convert hours into int64 nanoseconds (NaN becomes NAT_NS)
+def hours_to_ns(hours):
+    return hours_to_timedelta(hours).to_numpy().view(np.int64)
+
+
+# Function to round nanosecond moments down to whole microseconds, keeping NAT_NS
+def floor_microseconds(moments):
+    return np.where(moments == NAT_NS, NAT_NS, moments - moments % 1000)
+
 
 # Function to get the interpolated durations for the required stages and temperatures
 def get_interpolated_durations(df, required_stages, available_temperatures):
     """
-    Filters the DataFrame for the required stages and temperatures.
+    Filters the schedules (a ScheduleTable, a DataFrame or a LazyGrid, of
+    which only these cells are read) for the required stages and
+    temperatures and returns them as a ScheduleTable.
     Assumes valid input from the frontend.
     """
-    # Filter the DataFrame for the required stages and temperatures
-    conditions = (
-        (df['Temperature'].isin(available_temperatures)) &
-        (df['Stage'].isin(required_stages))
-    )
-    durations_df = df[conditions]
+    if isinstance(df, LazyGrid):
+        df = df.frame(available_temperatures, required_stages)
+    table = as_schedule_table(df)
+
+    # Filter for the required stages and temperatures; the appended False matches NO_CODE
+    wanted = np.append(np.isin(table.temperatures, np.asarray(available_temperatures, dtype=float)), False)
+    conditions = wanted[table.temperature] & np.isin(table.stage, np.asarray(required_stages, dtype=int))
+    durations = table.take(conditions)
 
-    if durations_df.empty:
+    if len(durations) == 0:
         print("No interpolated data available for the specified stages and temperatures.")
         return None
 
-    return durations_df
+    return durations
+
+
+# Function to convert a column of hours into timedeltas in one vectorized step
+def hours_to_timedelta(hours):
+    """
+    Converts hours (float Series or array, NaN allowed) to a TimedeltaIndex;
+    NaN becomes NaT.
+    """
+    return pd.to_timedelta(np.asarray(hours, dtype=float), unit='h')
+
+
+# Function to compute the switch moment of each row, NAT_NS for rows without a switch
+def calculate_exact_switch_times(start_ns, switch_hours):
+    """
+    Adds the switch offsets (hours) to the start moments (nanoseconds),
+    rounded down to microseconds like the datetime columns.
+    """
+    has_switch = ~np.isnan(switch_hours)
+    offsets = np.where(has_switch, hours_to_ns(switch_hours), 0)
+    return np.where(has_switch, floor_microseconds(start_ns + offsets), NAT_NS)
 
 
 # Function to calculate the collection times for each stage at each available temperature
 def calculate_start_times(extended_df, required_stages, available_temperatures, desired_time):
     """
     Calculates collection times based on the desired time and available temperatures.
+    Returns a ScheduleTable with the start, end (the desired time) and switch moments.
     """
-    filtered_start_df = get_interpolated_durations(extended_df, required_stages, available_temperatures)
+    table = get_interpolated_durations(extended_df, required_stages, available_temperatures)
 
-    if filtered_start_df is None:
+    if table is None:
         return None
 
-    # Calculate collection times by subtracting durations from the desired time
-    filtered_start_df = filtered_start_df.copy()
+    # Start moments are the desired time minus the durations
+    desired_ns = pd.Timestamp(desired_time).value
+    start_ns = floor_microseconds(desired_ns - hours_to_ns(table.development_time))
+    end_ns = np.full(len(table), desired_ns, dtype=np.int64)
 
-    # 'Collection_Time' is the desired time provided by the user
-    filtered_start_df['End_Time'] = desired_time
-
-    filtered_start_df['Start_Time'] = filtered_start_df.apply(
-        lambda row: desired_time - timedelta(hours=row['Development_Time']), axis=1
-    )
-    if 'Switch_Times' in filtered_start_df.columns:
-        filtered_start_df['Exact_Switch_Time'] = filtered_start_df.apply(
-            lambda row: row['Start_Time'] + timedelta(hours=row['Switch_Times']) if pd.notnull(row['Switch_Times']) else np.nan, axis=1
-        )
-
-    return filtered_start_df
+    return table.with_moments(start_ns, end_ns, calculate_exact_switch_times(start_ns, table.switch_hours))
 
 
 # Function to calculate the exact times for reaching the specified stages
 def calculate_end_times(extended_df, required_stages, available_temperatures, start_datetime):
     """
     Calculates exact times based on start date/time and available temperatures.
+    Returns a ScheduleTable with the start (the given start), end and switch moments.
     """
-    filtered_end_df = get_interpolated_durations(extended_df, required_stages, available_temperatures)
+    table = get_interpolated_durations(extended_df, required_stages, available_temperatures)
 
-    if filtered_end_df is None:
+    if table is None:
         return None
 
-    # Calculate exact times by adding durations to the start date/time
-    filtered_end_df = filtered_end_df.copy()
-    filtered_end_df['End_Time'] = filtered_end_df.apply(
-        lambda row: start_datetime + timedelta(hours=row['Development_Time']), axis=1
-    )
-
-    # Set 'Start_Time' to the provided start time
-    filtered_end_df['Start_Time'] = start_datetime
-
-    # Calculate 'Exact_Switch_Time' only where 'Switch_Times' is not NaN
-    if 'Switch_Times' in filtered_end_df.columns:
-        filtered_end_df['Exact_Switch_Time'] = filtered_end_df.apply(
-            lambda row: start_datetime + timedelta(hours=row['Switch_Times']) if pd.notnull(row['Switch_Times']) else np.nan, axis=1
-        )
-
-
+    # End moments are the start plus the durations
+    start_ns = np.full(len(table), pd.Timestamp(start_datetime).value, dtype=np.int64)
+    end_ns = floor_microseconds(start_ns + hours_to_ns(table.development_time))
 
-    return filtered_end_df
+    return table.with_moments(start_ns, end_ns, calculate_exact_switch_times(start_ns, table.switch_hours))
 
 
 # Function to generate all pairs of temperatures where the difference is <= max_diff degrees
@@ -94,110 +401,650 @@ def generate_temp_combinations(temps, max_diff=5):
     return combinations
 
 
+# Function to pivot the interpolated data into a temperature x stage array
+def pivot_development_times(df):
+    """
+    Pivot the long-format interpolated DataFrame into a 2D array of development
+    times indexed by [temperature, stage]. Missing cells are NaN; when a
+    (temperature, stage) pair occurs more than once the first row wins.
+    Returns the sorted unique temperatures, the sorted unique stages and the array.
+    """
+    unique_df = df.drop_duplicates(subset=['Temperature', 'Stage'], keep='first')
+    temperatures, temp_idx = np.unique(unique_df['Temperature'].to_numpy(dtype=float), return_inverse=True)
+    stages, stage_idx = np.unique(unique_df['Stage'].to_numpy(dtype=int), return_inverse=True)
+
+    grid = np.full((len(temperatures), len(stages)), np.nan)
+    grid[temp_idx, stage_idx] = unique_df['Development_Time'].to_numpy(dtype=float)
+
+    return temperatures, stages, grid
+
+
+# Function to map requested values onto positions in a sorted lookup axis
+def lookup_indices(axis, requested, tolerance_match=False):
+    """
+    Returns the index of each requested value in axis, or -1 if it is absent.
+    With tolerance_match, values are compared with np.isclose instead of ==.
+    """
+    requested = np.asarray(requested)
+    if len(axis) == 0:
+        return np.full(len(requested), -1)
+
+    if tolerance_match:
+        matches = np.isclose(requested.astype(float)[:, None], axis[None, :])
+        return np.where(matches.any(axis=1), matches.argmax(axis=1), -1)
+
+    positions = np.clip(np.searchsorted(axis, requested), 0, len(axis) - 1)
+    return np.where(axis[positions] == requested, positions, -1)
+
+
 # Function to calculate development times with switching between temperatures
 def calculate_switch_times(df, temps_combinations, required_stages):
-    new_rows = []
+    """
+    Returns a ScheduleTable of the interpolated rows followed by one row per
+    (Temp1, Temp2, Stage, Switch_Stage) schedule in which development starts
+    at Temp1 and switches to Temp2 once Switch_Stage is reached. All totals
+    are computed at once on a temperature x stage array.
+    """
     df['Temperature'] = df['Temperature'].astype(float)
     df['Stage'] = df['Stage'].astype(int)  # Ensure stages are integers
 
-    for (t1, t2) in temps_combinations:
-        for stage in required_stages:
-            for switch_stage in range(0, stage):
-                # Get development time for switch stage at t1
-                time_at_t1_df = df[(np.isclose(df['Temperature'], t1)) & (df['Stage'] == switch_stage)]
-                if time_at_t1_df.empty:
-                    continue
-                time_at_t1 = time_at_t1_df['Development_Time'].iloc[0]
+    if not temps_combinations or not required_stages:
+        return ScheduleTable.from_frame(df)
+
+    temperatures, stages, grid = pivot_development_times(df)
+    switch_columns = switch_rows_from_grid(temperatures, stages, grid, temps_combinations, required_stages)
+
+    return combine_switch_rows(df, [switch_columns], temps_combinations)
+
+
+# Function to compute the switch schedules of some temperature pairs on a pivoted grid
+def switch_rows_from_grid(temperatures, stages, grid, temps_combinations, required_stages, pair_offset=0):
+    """
+    Works on the arrays of pivot_development_times only, so it can run on a
+    shard of the pairs in another process. Returns a dict of equally long
+    column arrays (empty when no schedule is valid); 'Pair' is the position
+    of the temperature pair, counted from pair_offset.
+    """
+    # Pad with a NaN row and column so that index -1 marks a missing value
+    grid = np.pad(grid, ((0, 1), (0, 1)), constant_values=np.nan)
+
+    # Temperature pairs, in the order they were given
+    t1_values = np.array([t1 for t1, _ in temps_combinations])
+    t2_values = np.array([t2 for _, t2 in temps_combinations])
+    t1_idx = lookup_indices(temperatures, t1_values, tolerance_match=True)
+    t2_idx = lookup_indices(temperatures, t2_values, tolerance_match=True)
+
+    # Flattened (stage, switch_stage) pairs with switch_stage in 0..stage-1; target stages
+    # missing from the grid have no schedule, so they are dropped before expanding
+    stage_values = np.array(required_stages, dtype=int)
+    stage_values = stage_values[np.isin(stage_values, stages)]
+    repeats = np.clip(stage_values, 0, None)
+    target_stages = np.repeat(stage_values, repeats)
+    switch_stages = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    target_idx = lookup_indices(stages, target_stages)
+    switch_idx = lookup_indices(stages, switch_stages)
+
+    # [pair, stage/switch_stage] arrays of the three development times
+    time_at_t1 = grid[t1_idx[:, None], switch_idx[None, :]]
+    required_time_t2 = grid[t2_idx[:, None], target_idx[None, :]]
+    switch_time_t2 = grid[t2_idx[:, None], switch_idx[None, :]]
+
+    # NaN in any of the three marks an invalid schedule
+    total_time = np.subtract(required_time_t2, switch_time_t2, out=required_time_t2)
+    total_time += time_at_t1
+    del switch_time_t2
+
+    pair_pos, stage_pos = np.nonzero(~np.isnan(total_time))
+    return {
+        'Pair': (pair_pos + pair_offset).astype(np.int32),
+        'Stage': target_stages[stage_pos].astype(np.int16),
+        'Development_Time': total_time[pair_pos, stage_pos],
+        'Switch_Stage': switch_stages[stage_pos].astype(np.int16),
+        'Switch_Times': time_at_t1[pair_pos, stage_pos],
+    }
+
+
+# Function to append switch schedule columns (from one or more shards, in order) to the interpolated rows
+def combine_switch_rows(df, switch_columns, temps_combinations):
+    interpolated = ScheduleTable.from_frame(df)
+    switch_columns = [columns for columns in switch_columns if len(columns['Stage'])]
+    if not switch_columns:
+        return interpolated
+
+    def column(name):
+        return np.concatenate([columns[name] for columns in switch_columns])
+
+    # Temperatures are looked up once per pair and stored as codes
+    t1_values = np.array([t1 for t1, _ in temps_combinations], dtype=float)
+    t2_values = np.array([t2 for _, t2 in temps_combinations], dtype=float)
+    axis = np.unique(np.concatenate([t1_values, t2_values]))
+    pair = column('Pair')
+    t1_codes = temperature_codes(axis, t1_values)[pair]
+    switched = ScheduleTable(
+        axis,
+        np.ones(len(pair), dtype=bool),
+        column('Stage'),
+        t1_codes,
+        t1_codes,
+        temperature_codes(axis, t2_values)[pair],
+        column('Switch_Stage'),
+        column('Development_Time'),
+        column('Switch_Times'),
+    )
+
+    # Combine the interpolated rows with the switch schedules
+    return ScheduleTable.concat([interpolated, switched])
+
+# Function to build the temperature x stage array the planners work on
+def planner_grid(df, temperatures, max_stage):
+    """
+    Returns the sorted temperatures and a [temperature, stage] array of
+    development times for stages 0..max_stage (NaN where the grid has no value).
+    df is the interpolated DataFrame or a LazyGrid.
+    """
+    if isinstance(df, LazyGrid):
+        temps = np.array(sorted(set(temperatures)), dtype=float)
+        return temps, df.cells(temps, np.arange(max_stage + 1))
+
+    grid_temps, grid_stages, grid = pivot_development_times(df)
+    grid = np.pad(grid, ((0, 1), (0, 1)), constant_values=np.nan)
 
-                # Get development time for the required stage at t2
-                required_stage_t2_df = df[(np.isclose(df['Temperature'], t2)) & (df['Stage'] == stage)]
-                if required_stage_t2_df.empty:
+    temps = np.array(sorted(set(temperatures)), dtype=float)
+    temp_idx = lookup_indices(grid_temps, temps, tolerance_match=True)
+    stage_idx = lookup_indices(grid_stages, np.arange(max_stage + 1))
+    return temps, grid[temp_idx[:, None], stage_idx[None, :]]
+
+
+# Function to keep the required stages the grid has, so the planners never size their state past it
+def planner_stages(df, required_stages):
+    """
+    df is the interpolated DataFrame or a LazyGrid.
+    """
+    if isinstance(df, LazyGrid):
+        last_stage = df.max_stage
+    else:
+        last_stage = int(df['Stage'].max()) if len(df) else -1
+    return [stage for stage in required_stages if 0 <= stage <= last_stage]
+
+
+# Function to allow switches only between distinct temperatures at most max_diff apart
+def switch_adjacency(temps, max_diff=5):
+    diff = np.abs(temps[:, None] - temps[None, :])
+    return (diff <= max_diff) & ~np.eye(len(temps), dtype=bool)
+
+
+# Function to turn a list of (switch_stage, from_index, to_index) into an output row
+def schedule_row(temps, grid, stage, start_index, switches):
+    """
+    Builds a row in the calculate_switch_times shape for a schedule that starts
+    at temps[start_index] and switches at the given stages. Temp1/Temp2,
+    Switch_Stage and Switch_Times describe the first switch; 'Segments' lists
+    every constant-temperature segment with its start offset and duration (hours).
+    """
+    boundaries = [0] + [switch_stage for switch_stage, _, _ in switches] + [stage]
+    segment_temps = [start_index] + [to_index for _, _, to_index in switches]
+
+    segments = []
+    elapsed = 0.0
+    for i, temp_index in enumerate(segment_temps):
+        from_stage, to_stage = boundaries[i], boundaries[i + 1]
+        # The first segment also carries the time to reach stage 0
+        duration = grid[temp_index, to_stage] - (grid[temp_index, from_stage] if i > 0 else 0.0)
+        segments.append({
+            'Temperature': float(temps[temp_index]),
+            'From_Stage': int(from_stage),
+            'To_Stage': int(to_stage),
+            'Start_Hours': float(elapsed),
+            'Duration': float(duration),
+        })
+        elapsed += duration
+
+    has_switch = len(switches) > 0
+    return {
+        'Switch': has_switch,
+        'Stage': int(stage),
+        'Temperature': float(temps[start_index]),
+        'Temp1': float(temps[start_index]) if has_switch else np.nan,
+        'Temp2': float(temps[segment_temps[1]]) if has_switch else np.nan,
+        'Development_Time': float(elapsed),
+        'Switch_Stage': int(boundaries[1]) if has_switch else np.nan,
+        'Switch_Times': segments[1]['Start_Hours'] if has_switch else np.nan,
+        'Switch_Count': len(switches),
+        'Segments': segments,
+    }
+
+
+# Function to find the fastest schedule with a given number of temperature switches
+def plan_fastest_schedules(df, temperatures, required_stages, max_switches=2, max_diff=5, min_switches=0):
+    """
+    Dynamic programming over stages as graph nodes: advancing one stage at
+    temperature t costs the development time between the two stages at t, and
+    a switch to any temperature within max_diff is free but uses one of
+    max_switches. For every start temperature, required stage and switch count
+    k (min_switches..max_switches) the fastest schedule with exactly k switches
+    is returned. The state also carries the start temperature, so each stage
+    costs T*K*T*T: O(K*T^3*S) instead of enumerating all switch combinations.
+    Stages outside the grid (negative or above its last stage) have no
+    schedule and are skipped.
+    """
+    required_stages = planner_stages(df, required_stages)
+    if not temperatures or not required_stages:
+        return pd.DataFrame()
+
+    max_stage = max(required_stages)
+    temps, grid = planner_grid(df, temperatures, max_stage)
+    n_temps, n_stages = grid.shape
+    adjacency = switch_adjacency(temps, max_diff)
+
+    costs = np.diff(grid, axis=1)
+    costs = np.where(np.isnan(costs), np.inf, costs)
+
+    # state[start, k, t]: fastest time to the current stage, started at `start`, now at t, after k switches
+    state = np.full((n_temps, max_switches + 1, n_temps), np.inf)
+    start_times = np.where(np.isnan(grid[:, 0]), np.inf, grid[:, 0])
+    state[np.arange(n_temps), 0, np.arange(n_temps)] = start_times
+
+    arrived = []        # state on reaching each stage, before switching there
+    switched_from = []  # temperature switched from at each stage, -1 if no switch
+    for stage in range(n_stages):
+        if stage > 0:
+            state = state + costs[None, None, :, stage - 1]
+        arrived.append(state)
+
+        # Switching at this stage: t_from -> t_to, using one more switch
+        candidates = np.where(adjacency[None, None, :, :], state[:, :-1, :, None], np.inf)
+        best_from = candidates.argmin(axis=2)
+        best_time = candidates.min(axis=2)
+        improves = best_time < state[:, 1:, :]
+
+        state = state.copy()
+        state[:, 1:, :] = np.where(improves, best_time, state[:, 1:, :])
+        from_index = np.full(state.shape, -1)
+        from_index[:, 1:, :] = np.where(improves, best_from, -1)
+        switched_from.append(from_index)
+
+    rows = []
+    for stage in required_stages:
+        for start_index in range(n_temps):
+            for switches in range(min_switches, max_switches + 1):
+                final = arrived[stage][start_index, switches]
+                temp_index = int(final.argmin())
+                if not np.isfinite(final[temp_index]):
                     continue
-                required_time_t2 = required_stage_t2_df['Development_Time'].iloc[0]
 
-                # Get development time for the switch stage at t2
-                switch_stage_t2_df = df[(np.isclose(df['Temperature'], t2)) & (df['Stage'] == switch_stage)]
-                if switch_stage_t2_df.empty:
+                # Walk back through the stages to recover where the switches happened
+                path, k = [], switches
+                for switch_stage in range(stage - 1, -1, -1):
+                    previous = switched_from[switch_stage][start_index, k, temp_index]
+                    if previous >= 0:
+                        path.append((switch_stage, int(previous), temp_index))
+                        temp_index, k = int(previous), k - 1
+                rows.append(schedule_row(temps, grid, stage, start_index, path[::-1]))
+
+    return pd.DataFrame(rows)
+
+
+# Function to find schedules whose total duration is as close as possible to a target
+def plan_target_schedules(df, temperatures, required_stages, target_hours, max_switches=2, max_diff=5,
+                          min_switches=0, resolution_minutes=5):
+    """
+    Dynamic programming over the set of reachable durations, discretized to
+    resolution_minutes, for schedules with up to max_switches switches. For
+    every required stage and switch count k the schedule whose duration is
+    closest to target_hours is returned (its Development_Time is exact, the
+    discretization only affects which schedule is picked). Durations above
+    twice the target are not considered, and the buckets stop at the longest
+    duration the grid allows. Stages outside the grid are skipped.
+    """
+    required_stages = planner_stages(df, required_stages)
+    if not temperatures or not required_stages or target_hours is None or target_hours <= 0:
+        return pd.DataFrame()
+
+    max_stage = max(required_stages)
+    temps, grid = planner_grid(df, temperatures, max_stage)
+    n_temps, n_stages = grid.shape
+    adjacency = switch_adjacency(temps, max_diff)
+
+    resolution = resolution_minutes / 60
+    valid = ~np.isnan(grid)
+    buckets = np.rint(np.where(valid, grid, 0) / resolution).astype(int)
+    steps = np.diff(buckets, axis=1)
+    target_bucket = int(round(target_hours / resolution))
+    # No schedule is longer than the slowest start plus the slowest step of every stage
+    valid_steps = np.where(valid[:, :-1] & valid[:, 1:], steps, 0)
+    slowest_start = max(int(buckets[valid[:, 0], 0].max(initial=0)), 0)
+    longest_bucket = slowest_start + int(np.maximum(valid_steps.max(axis=0, initial=0), 0).sum())
+    n_buckets = min(2 * target_bucket, longest_bucket) + 1
+
+    # reachable[k, t, b]: duration bucket b reachable at the current stage with k switches, now at t
+    reachable = np.zeros((max_switches + 1, n_temps, n_buckets), dtype=bool)
+    for t in range(n_temps):
+        if valid[t, 0] and 0 <= buckets[t, 0] < n_buckets:
+            reachable[0, t, buckets[t, 0]] = True
+
+    arrived = []  # reachable buckets on arriving at each stage, before switching there
+    for stage in range(n_stages):
+        if stage > 0:
+            advanced = np.zeros_like(reachable)
+            for t in range(n_temps):
+                if not (valid[t, stage - 1] and valid[t, stage]):
+                    continue
+                shift = steps[t, stage - 1]
+                if abs(shift) >= n_buckets:
+                    # Every reachable duration moves out of the bucket range
                     continue
-                switch_time_t2 = switch_stage_t2_df['Development_Time'].iloc[0]
+                if shift >= 0:
+                    advanced[:, t, shift:] = reachable[:, t, :n_buckets - shift]
+                else:
+                    advanced[:, t, :shift] = reachable[:, t, -shift:]
+            reachable = advanced
+        arrived.append(reachable)
+
+        # Switching at this stage: t_from -> t_to, using one more switch
+        switched = reachable.copy()
+        switched[1:] |= (reachable[:-1, :, None, :] & adjacency[None, :, :, None]).any(axis=1)
+        reachable = switched
+
+    rows = []
+    for stage in required_stages:
+        for switches in range(min_switches, max_switches + 1):
+            final = arrived[stage][switches]
+            temp_candidates, bucket_candidates = np.nonzero(final)
+            if len(bucket_candidates) == 0:
+                continue
+            best = np.abs(bucket_candidates - target_bucket).argmin()
+            temp_index, bucket = int(temp_candidates[best]), int(bucket_candidates[best])
+
+            # Walk back, preferring to stay at the same temperature
+            path, k = [], switches
+            for switch_stage in range(stage - 1, -1, -1):
+                bucket -= steps[temp_index, switch_stage]
+                if not arrived[switch_stage][k, temp_index, bucket]:
+                    previous = np.nonzero(adjacency[:, temp_index] & arrived[switch_stage][k - 1, :, bucket])[0][0]
+                    path.append((switch_stage, int(previous), temp_index))
+                    temp_index, k = int(previous), k - 1
+            rows.append(schedule_row(temps, grid, stage, temp_index, path[::-1]))
+
+    return pd.DataFrame(rows)
+
+
+# Function to add schedules with two or more switches to the extended switch table
+def add_multi_switch_schedules(extended_df, interpolated_df, available_temperatures, required_stages, max_switches,
+                               target_hours=None):
+    """
+    Appends the fastest schedules with 2..max_switches switches and, when a
+    target duration is given (start and desired time both set), the schedules
+    closest to it. Single switches are already enumerated by calculate_switch_times.
+    """
+    if max_switches < 2:
+        return extended_df
+
+    planned = [plan_fastest_schedules(interpolated_df, available_temperatures, required_stages,
+                                      max_switches=max_switches, min_switches=2)]
+    if target_hours:
+        planned.append(plan_target_schedules(interpolated_df, available_temperatures, required_stages, target_hours,
+                                             max_switches=max_switches, min_switches=2))
+    planned = [ScheduleTable.from_frame(df) for df in planned if not df.empty]
+    if not planned:
+        return extended_df
+
+    return ScheduleTable.concat([as_schedule_table(extended_df), *planned])
+
+
+# Function to list the offsets of the second and later switches of multi-switch schedules
+def later_switch_hours(table):
+    """
+    Returns (positions, hours): for every second or later switch, the
+    row position in the ScheduleTable and its offset in hours from the start.
+    """
+    if table.segments is None:
+        return np.array([], dtype=int), np.array([], dtype=float)
+
+    positions, hours = [], []
+    for position, segments in enumerate(table.segments):
+        if isinstance(segments, list) and len(segments) > 2:
+            for segment in segments[2:]:
+                positions.append(position)
+                hours.append(segment['Start_Hours'])
+    return np.array(positions, dtype=int), np.array(hours, dtype=float)
 
-                # Calculate time after switching
-                time_at_t2 = required_time_t2 - switch_time_t2
 
-                new_rows.append({
-                    'Switch': True,
-                    'Stage': stage,
-                    'Temperature': t1,
-                    'Temp1': t1,
-                    'Temp2': t2,
-                    'Development_Time': time_at_t1 + time_at_t2,
-                    'Switch_Stage': switch_stage,
-                    'Switch_Times': time_at_t1,
-                })
+# Nanosecond offsets used by the window filters; 1970-01-01 was a Thursday (weekday 3)
+NS_PER_MINUTE = 60 * 10**9
+MINUTES_PER_DAY = 24 * 60
+NS_PER_DAY = MINUTES_PER_DAY * NS_PER_MINUTE
+NS_PER_WEEK = 7 * NS_PER_DAY
+EPOCH_WEEKDAY = 3
 
-    # Create a DataFrame from the new rows
-    new_df = pd.DataFrame(new_rows)
 
-    # Combine the original DataFrame with the new DataFrame
-    extended_df = pd.concat([df, new_df], ignore_index=True, sort=False)
+@lru_cache(maxsize=256)
+def clock_minutes(clock):
+    """
+    Minute of the day of an 'HH:MM' string.
+    """
+    hours, minutes = clock.split(':')
+    return int(hours) * 60 + int(minutes)
 
-    return extended_df
 
-def filter_results_by_timing(results_df, lab_days, lab_start_time, lab_end_time, collection_start, collection_end, start_datetime, desired_time):
+@lru_cache(maxsize=256)
+def weekly_windows(windows):
     """
-    Filter the results DataFrame based on user availability.
+    Turns a tuple of (weekday, 'HH:MM' start, 'HH:MM' end) windows into sorted,
+    merged (starts, ends) arrays of inclusive nanosecond offsets from Monday
+    00:00. A window ending before it starts runs past midnight into the next
+    day (Sunday nights wrap to Monday); an end of None means the whole day.
     """
-    if results_df is None or results_df.empty:
+    intervals = []
+    for weekday, start, end in windows:
+        day_start = weekday * NS_PER_DAY
+        start_ns = day_start + clock_minutes(start) * NS_PER_MINUTE
+        if end is None:
+            end_ns = day_start + NS_PER_DAY - 1
+        elif clock_minutes(end) >= clock_minutes(start):
+            end_ns = day_start + clock_minutes(end) * NS_PER_MINUTE
+        else:
+            end_ns = day_start + NS_PER_DAY + clock_minutes(end) * NS_PER_MINUTE
+        if end_ns >= NS_PER_WEEK:
+            intervals.append((0, end_ns - NS_PER_WEEK))
+            end_ns = NS_PER_WEEK - 1
+        intervals.append((start_ns, end_ns))
+
+    intervals.sort()
+    merged = []
+    for start_ns, end_ns in intervals:
+        if merged and start_ns <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end_ns)
+        else:
+            merged.append([start_ns, end_ns])
+    merged = np.array(merged, dtype=np.int64).reshape(-1, 2)
+    return merged[:, 0], merged[:, 1]
+
+
+def lab_windows(lab_days, lab_start_time, lab_end_time, lab_hours=None):
+    """
+    Weekly windows in which lab work is possible, or None when unrestricted.
+    lab_hours ({weekday: [(start, end), ...]}) takes precedence over the
+    lab_days / lab_start_time / lab_end_time triple.
+    """
+    if lab_hours:
+        return weekly_windows(tuple(
+            (weekday, start, end)
+            for weekday, ranges in sorted(lab_hours.items())
+            for start, end in ranges
+        ))
+    has_hours = bool(lab_start_time and lab_end_time)
+    if not lab_days and not has_hours:
         return None
+    days = sorted(set(lab_days)) if lab_days else range(7)
+    if has_hours:
+        return weekly_windows(tuple((day, lab_start_time, lab_end_time) for day in days))
+    return weekly_windows(tuple((day, '00:00', None) for day in days))
 
-    results_df = results_df.copy()
 
-    datetime_column = 'End_Time' if start_datetime else 'Start_Time'
-    results_df[datetime_column] = pd.to_datetime(results_df[datetime_column])
+def week_offsets(moments):
+    """
+    Nanoseconds since the preceding Monday 00:00 of int64 nanosecond moments (NAT_NS gives garbage).
+    """
+    return (moments + EPOCH_WEEKDAY * NS_PER_DAY) % NS_PER_WEEK
 
-    # Extract weekday and time from the datetime column
-    results_df['weekday_exact'] = results_df[datetime_column].dt.weekday
-    results_df['time_exact'] = results_df[datetime_column].dt.time
 
-    # Check if 'Exact_Switch_Time' exists and is not all NaN
-    if 'Exact_Switch_Time' in results_df.columns and results_df['Exact_Switch_Time'].notnull().any():
-        results_df['Exact_Switch_Time'] = pd.to_datetime(results_df['Exact_Switch_Time'])
-        results_df['weekday_switch'] = results_df['Exact_Switch_Time'].dt.weekday
-        results_df['time_switch'] = results_df['Exact_Switch_Time'].dt.time
-    else:
-        # If there are no valid switch times, remove these columns to avoid confusion
-        results_df = results_df.drop(columns=['Exact_Switch_Time'], errors='ignore')
+def in_windows(offsets, windows):
+    """
+    Boolean array: which week offsets fall inside one of the merged windows.
+    """
+    starts, ends = windows
+    if len(starts) == 0:
+        return np.zeros(len(offsets), dtype=bool)
+    position = np.searchsorted(starts, offsets, side='right') - 1
+    return (position >= 0) & (offsets <= ends[np.maximum(position, 0)])
 
-    # Initialize mask
-    mask = pd.Series(True, index=results_df.index)
-
-    if lab_days:
-        mask &= results_df['weekday_exact'].isin(lab_days)
-        if 'weekday_switch' in results_df.columns:
-            switch_mask = results_df['Exact_Switch_Time'].notnull()
-            # For rows with switch times, apply the filter; else, don't alter the mask
-            mask &= (~switch_mask) | (results_df['weekday_switch'].isin(lab_days))
-
-    if lab_start_time and lab_end_time:
-        lab_start_time_obj = datetime.strptime(lab_start_time, '%H:%M').time()
-        lab_end_time_obj = datetime.strptime(lab_end_time, '%H:%M').time()
-        mask &= results_df['time_exact'].between(lab_start_time_obj, lab_end_time_obj)
-        if 'time_switch' in results_df.columns:
-            switch_mask = results_df['Exact_Switch_Time'].notnull()
-            mask &= (~switch_mask) | results_df['time_switch'].between(lab_start_time_obj, lab_end_time_obj)
 
+def filter_results_by_timing(results_df, lab_days, lab_start_time, lab_end_time, collection_start, collection_end, start_datetime, desired_time, lab_hours=None):
+    """
+    Filter the results (a ScheduleTable from calculate_start_times or
+    calculate_end_times) based on user availability.
+    Collection moments and switch moments must fall inside the lab windows
+    (lab_hours, or lab_days with lab_start_time/lab_end_time); collection
+    moments must also fall inside the daily collection window. Windows whose
+    end is before their start run past midnight. Returns a ScheduleTable
+    sorted by stage and development time, or None.
+    """
+    if results_df is None or len(results_df) == 0:
+        return None
+
+    table = as_schedule_table(results_df)
+
+    # Collection moments: the end with a start time, otherwise the start; tables without moments match no window
+    moments = table.end_ns if start_datetime else table.start_ns
+    if moments is None:
+        moments = np.full(len(table), NAT_NS, dtype=np.int64)
+    switch_moments = table.switch_ns if table.switch_ns is not None else np.full(len(table), NAT_NS, dtype=np.int64)
+    has_switch = switch_moments != NAT_NS
+
+    lab = lab_windows(lab_days, lab_start_time, lab_end_time, lab_hours)
+    collection = None
     if collection_start and collection_end:
-        collection_start_time = datetime.strptime(collection_start, '%H:%M').time()
-        collection_end_time = datetime.strptime(collection_end, '%H:%M').time()
-        mask &= results_df['time_exact'].between(collection_start_time, collection_end_time)
+        collection = weekly_windows(tuple((day, collection_start, collection_end) for day in range(7)))
+
+    # Initialize mask
+    mask = np.ones(len(table), dtype=bool)
+
+    if lab is not None or collection is not None:
+        mask &= moments != NAT_NS
+        offsets = week_offsets(moments)
+        if lab is not None:
+            mask &= in_windows(offsets, lab)
+        if collection is not None:
+            mask &= in_windows(offsets, collection)
+
+    if lab is not None and has_switch.any():
+        # For rows with switch times, apply the filter; else, don't alter the mask
+        mask &= ~has_switch | in_windows(week_offsets(switch_moments), lab)
+
+    # Second and later switches of multi-switch schedules must also fall on lab days and hours
+    if lab is not None:
+        positions, hours = later_switch_hours(table)
+        if len(positions):
+            outside = ~in_windows(week_offsets(table.start_ns[positions] + hours_to_ns(hours)), lab)
+            mask[positions[outside]] = False
 
-    filtered_df = results_df[mask]
+    filtered = table.take(mask)
 
-    if filtered_df.empty:
+    if len(filtered) == 0:
         print("No available times match the specified criteria.")
         return None
 
-    return filtered_df.sort_values(by=['Stage', 'Development_Time'], ascending=[True, True])
+    return filtered.take(np.lexsort((filtered.development_time, filtered.stage)))
+
+
+# Function to find the earliest start of every schedule whose lab moments fall inside the windows
+def find_earliest_starts(extended_df, required_stages, available_temperatures, search_start, search_days=14,
+                         step_minutes=15, lab_days=None, lab_start_time=None, lab_end_time=None,
+                         collection_start=None, collection_end=None, lab_hours=None, chunk_cells=2**20):
+    """
+    Scans the candidate starts search_start + k * step_minutes within
+    search_days. For every schedule (stage, temperature or switch schedule)
+    returns its calculate_end_times row moved to the earliest candidate at
+    which the collection moment and every switch moment fall inside the lab
+    windows and the collection moment inside the collection window.
+    Schedules without a feasible start are dropped; returns None if none is
+    feasible. Candidates are checked in (rows x starts) NumPy sweeps of at
+    most chunk_cells cells, so memory stays bounded however long the search
+    range is. Returns a ScheduleTable sorted by stage, start and
+    development time.
+    """
+    results = calculate_end_times(extended_df, required_stages, available_temperatures, search_start)
+    if results is None or len(results) == 0:
+        return None
+
+    step_ns = step_minutes * NS_PER_MINUTE
+    n_starts = max(1, int(search_days * MINUTES_PER_DAY // step_minutes))
+    start_ns = pd.Timestamp(search_start).value
+    start_offsets = (start_ns + EPOCH_WEEKDAY * NS_PER_DAY + np.arange(n_starts, dtype=np.int64) * step_ns) % NS_PER_WEEK
+
+    # Nanoseconds from the start to each moment that has to fall inside a window
+    collection_ns = results.end_ns - start_ns
+    has_switch = results.switch_ns != NAT_NS
+    switch_ns = np.where(has_switch, results.switch_ns - np.where(has_switch, start_ns, 0), 0)
+    later_positions, later_hours = later_switch_hours(results)
+    later_ns = hours_to_ns(later_hours)
+
+    lab = lab_windows(lab_days, lab_start_time, lab_end_time, lab_hours)
+    collection = None
+    if collection_start and collection_end:
+        collection = weekly_windows(tuple((day, collection_start, collection_end) for day in range(7)))
+
+    def inside(delays, windows):
+        return in_windows((start_offsets[None, :] + delays[:, None]) % NS_PER_WEEK, windows)
+
+    chunk_rows = max(1, chunk_cells // n_starts)
+    earliest = np.zeros(len(results), dtype=np.int64)
+    for low in range(0, len(results), chunk_rows):
+        high = min(low + chunk_rows, len(results))
+        feasible = np.ones((high - low, n_starts), dtype=bool)
+        if collection is not None:
+            feasible &= inside(collection_ns[low:high], collection)
+        if lab is not None:
+            feasible &= inside(collection_ns[low:high], lab)
+            switched = np.flatnonzero(has_switch[low:high])
+            if len(switched):
+                feasible[switched] &= inside(switch_ns[low + switched], lab)
+            later = (later_positions >= low) & (later_positions < high)
+            if later.any():
+                np.logical_and.at(feasible, later_positions[later] - low, inside(later_ns[later], lab))
+        earliest[low:high] = np.where(feasible.any(axis=1), feasible.argmax(axis=1), -1)
+
+    found = earliest >= 0
+    if not found.any():
+        return None
+
+    results = results.take(found)
+    shift = earliest[found] * step_ns
+    results = results.with_moments(
+        results.start_ns + shift,
+        results.end_ns + shift,
+        np.where(results.switch_ns != NAT_NS, results.switch_ns + shift, NAT_NS),
+    )
+
+    return results.take(np.lexsort((results.development_time, results.start_ns, results.stage)))
+
+
+# Function to pick, for each stage, the schedule that can start first
+def suggest_earliest_start(df, required_stages):
+    """
+    Picks per stage the row with the earliest start, preferring schedules
+    without switches and then the shortest development time on ties.
+    Rows follow the order of required_stages.
+    """
+    if df is None or len(df) == 0:
+        return None
+
+    table = as_schedule_table(df)
+    ordered = np.lexsort((table.development_time, table.switch, table.start_ns))
+    stages, first = np.unique(table.stage[ordered], return_index=True)
+    earliest = dict(zip(stages.tolist(), ordered[first].tolist()))
+    positions = [earliest[stage] for stage in dict.fromkeys(required_stages) if stage in earliest]
+    return table.take(np.array(positions, dtype=int))
 
 
 # Function to suggest the fastest temperature for each stage based on the minimum development time
@@ -206,38 +1053,34 @@ def suggest_fastest_temperature(df, required_stages):
     Suggest the fastest temperature for each stage based on development time,
     preferring schedules without temperature switches.
     """
-    if df.empty:
+    if len(df) == 0:
         print("No data available to analyze.")
         return None
 
-    fastest_entries = []  # List to collect fastest entries
+    table = as_schedule_table(df)
+    development_times = np.where(np.isnan(table.development_time), np.inf, table.development_time)
+    fastest_entries = []  # Positions of the fastest entries
 
     for stage in required_stages:
-        stage_df = df[df['Stage'] == stage]
-        if stage_df.empty:
+        stage_rows = np.flatnonzero(table.stage == stage)
+        if len(stage_rows) == 0:
             continue
 
         # Prefer non-switch schedules
-        non_switch_df = stage_df[stage_df['Switch'] == False]
-        if not non_switch_df.empty:
-            fastest = non_switch_df.loc[non_switch_df['Development_Time'].idxmin()]
-        else:
-            fastest = stage_df.loc[stage_df['Development_Time'].idxmin()]
-
-        fastest_entries.append(fastest)
-
-    # Create a DataFrame from the list of fastest entries
-    fastest_temperatures = pd.DataFrame(fastest_entries).reset_index(drop=True)
+        non_switch_rows = stage_rows[~table.switch[stage_rows]]
+        candidates = non_switch_rows if len(non_switch_rows) else stage_rows
+        fastest_entries.append(candidates[development_times[candidates].argmin()])
 
-    return fastest_temperatures
+    return table.take(np.array(fastest_entries, dtype=int))
 
 # Convert DataFrame with Timedelta to a serializable format
 def convert_df_to_serializable(df):
     """
-    Convert a DataFrame to a JSON-serializable format.
+    Convert a DataFrame (or a ScheduleTable, which is converted here at the
+    API boundary) to a JSON-serializable format.
     Converts datetime and timedelta fields into string format.
     """
-    df_copy = df.copy()
+    df_copy = df.to_frame() if isinstance(df, ScheduleTable) else df.copy()
     date_format = '%a %d.%m %H:%M'  # Format: weekday dd.mm HH:mm
 
     # Iterate through each column in the DataFrame
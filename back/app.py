@@ -1,27 +1,37 @@
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-import numpy as np
+import json
+import threading
 from user_handler import handle_and_validate_user_input
 from db_handler import (
     get_db_connection,
     fetch_all_data,
-    add_record,
-    prepare_data,
-    create_interpolated_dataset,
+    migrate_database,
+    add_records,
     delete_record,
+    bump_data_version,
+    get_species_version,
+    get_table_version,
+    add_write_listener,
+    fetch_entries_page,
+    iter_entries,
 )
-from analysis import (
-    calculate_start_times,
-    calculate_end_times,
-    calculate_switch_times,
-    filter_results_by_timing,
-    generate_temp_combinations,
-    get_interpolated_durations,
-    suggest_fastest_temperature,
-    convert_df_to_serializable,
+from grid_handler import get_species_grid, start_grid_refresher, warm_up, WARMUP
+from trace_handler import new_request_trace
+from cache_handler import ResultCache, result_cache_key
+from job_handler import JobQueue, JobQueueFull, DONE as JOB_DONE, FAILED as JOB_FAILED
+from parallel_handler import calculate_switch_times_many
+from pipeline_handler import (
+    build_species_tables,
+    switch_max_stage,
+    run_scenario,
+    prepare_graph_data,
+    process_graph_data,
+    GRAPH_FORMATS,
 )
-import pandas as pd
+from metrics_handler import timed_step, start_request_timing, finish_request_timing, render_metrics
+from analysis import generate_temp_combinations
 from datetime import timedelta
 
 app = Flask(__name__)
@@ -29,6 +39,108 @@ app.config['JWT_SECRET_KEY'] = 'your_secret_key'
 jwt = JWTManager(app)
 CORS(app)
 
+# Species warmed up at startup, None when the warm-up is disabled
+warmed_species = None
+
+# Bring existing databases up to the current schema, warm up if enabled and keep the stored grids fresh
+def start_backend():
+    global warmed_species
+    migrate_database()
+    if WARMUP:
+        warmed_species = warm_up()
+    start_grid_refresher()
+
+# Process pool workers spawned by a server started with `python app.py` import this
+# module as __mp_main__; only the serving process starts the backend
+if __name__ != '__mp_main__':
+    start_backend()
+
+# Finished /predict responses, dropped on every data write
+result_cache = ResultCache()
+add_write_listener(result_cache.clear)
+
+# Predictions submitted through /predict-jobs
+prediction_jobs = JobQueue()
+
+# Encoded payloads of the read-only routes: name -> (table version, body)
+_read_payloads = {}
+_read_payloads_lock = threading.Lock()
+
+# Serve a read-only payload with a strong ETag tied to the table version
+def versioned_json_response(name, build_payload):
+    """
+    Answers 304 when If-None-Match holds the current ETag, without reading the
+    measurements. Otherwise returns the payload of build_payload(), encoded
+    once per table version and reused until the next write.
+    """
+    version = get_table_version()
+    etag = f'{name}-{version}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    with _read_payloads_lock:
+        cached = _read_payloads.get(name)
+    if cached is not None and cached[0] == version:
+        body = cached[1]
+    else:
+        body = jsonify(build_payload()).get_data()
+        with _read_payloads_lock:
+            _read_payloads[name] = (version, body)
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+# Time every request; the pipeline steps inside it are timed with timed_step
+@app.before_request
+def before_request_timing():
+    start_request_timing()
+
+@app.after_request
+def after_request_timing(response):
+    server_timing = finish_request_timing(request.endpoint)
+    if server_timing:
+        response.headers['Server-Timing'] = server_timing
+    return response
+
+# Run the whole /predict pipeline for validated input and return the encoded JSON body
+def predict_body(sanitized_data, trace=None):
+    """
+    Shared by /predict and /predict-jobs. Identical requests on unchanged data
+    are answered from the result cache (traced requests always run).
+    Raises ValueError when the input cannot be planned.
+    """
+    required_species = sanitized_data['required_species']
+    required_stages = sanitized_data['required_stages']
+    available_temperatures = sanitized_data['available_temperatures']
+
+    cache_key = result_cache_key(sanitized_data, get_species_version(required_species))
+    cached_body = None if trace else result_cache.get(cache_key)
+    if cached_body is not None:
+        return cached_body
+
+    species_grid, extended_df = build_species_tables(required_species, available_temperatures, required_stages)
+
+    # Prepare graph data and schedule data for the frontend
+    with timed_step('graph_data'):
+        graph_data = prepare_graph_data(species_grid, available_temperatures, sanitized_data['graph_format'])
+
+    temperature_colors = graph_data.get('temperature_colors', {})
+
+    scenario_result = run_scenario(
+        sanitized_data, species_grid, extended_df, temperature_colors, trace=trace
+    )
+
+    with timed_step('json_encode'):
+        body = jsonify({
+            'graphData': graph_data,
+            **scenario_result,
+        }).get_data()
+    result_cache.put(cache_key, body)
+    return body
+
 @app.route('/predict', methods=['POST'])
 def predict_stages():
     try:
@@ -37,87 +149,223 @@ def predict_stages():
         
         # Handle and validate the user input
         sanitized_data = handle_and_validate_user_input(input_data)
-        
-        # Extract sanitized data for use in prediction logic
-        required_species = sanitized_data['required_species']
-        required_stages = sanitized_data['required_stages']
-        available_temperatures = sanitized_data['available_temperatures']
-        start_datetime = sanitized_data['start_datetime']
-        desired_time = sanitized_data['desired_time']
-        collection_start = sanitized_data['collection_start']
-        collection_end = sanitized_data['collection_end']
-        lab_days = sanitized_data['lab_days']
-        lab_start_time = sanitized_data['lab_start_time']
-        lab_end_time = sanitized_data['lab_end_time']
-
-        data = fetch_all_data()
-        if required_species:
-            filtered_data = [entry for entry in data if entry['species'] == required_species]
-        else:
-            return jsonify({"error": "No species provided or species not found"}), 400
-
-        points, values = prepare_data(filtered_data)
 
-        if not points.size or not values.size:
-            return jsonify({"error": "No valid data for interpolation."}), 400
-        if len(np.unique(points, axis=0)) < 3:
-            return jsonify({"error": "Not enough unique data points for interpolation"}), 400
+        if not sanitized_data['required_species']:
+            return jsonify({"error": "No species provided or species not found"}), 400
 
-        max_stage = 40
-        interpolated_df = create_interpolated_dataset(
-            points,
-            values,
-            method='rbf',
-            available_temperatures=available_temperatures,
-            max_stage=max_stage
-        )
+        # Intermediate tables are written in the background, only for traced requests
+        trace = new_request_trace()
 
-        temp_combinations = generate_temp_combinations(available_temperatures)
+        response = Response(predict_body(sanitized_data, trace=trace), mimetype='application/json')
+        if trace:
+            response.headers['X-Trace-ID'] = trace.request_id
+        return response, 200
 
-        extended_df = calculate_switch_times(interpolated_df, temp_combinations, required_stages)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        if desired_time:
-            results_df = calculate_start_times(extended_df, required_stages, available_temperatures, desired_time)
-        elif start_datetime:
-            results_df = calculate_end_times(extended_df, required_stages, available_temperatures, start_datetime)
-        else:
-            results_df = get_interpolated_durations(interpolated_df, required_stages, available_temperatures)
+# Run a prediction job on a worker thread, outside any request
+def run_prediction_job(sanitized_data):
+    with app.app_context():
+        return predict_body(sanitized_data)
 
-        print(results_df)
-        results_df.to_csv('output01.csv', index=False)
+@app.route('/predict-jobs', methods=['POST'])
+def submit_prediction_job():
+    """
+    Validates the /predict input, queues the prediction and returns its job ID
+    right away (202). Poll GET /predict-jobs/<job_id> and fetch the body of the
+    /predict response from GET /predict-jobs/<job_id>/result.
+    """
+    try:
+        sanitized_data = handle_and_validate_user_input(request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        if start_datetime or collection_start or lab_days or lab_start_time:
-            filtered_results_df = filter_results_by_timing(
-                results_df, lab_days, lab_start_time, lab_end_time, collection_start, collection_end, start_datetime, desired_time
+    try:
+        job = prediction_jobs.submit(run_prediction_job, sanitized_data)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = f'/predict-jobs/{job.job_id}'
+    return response, 202
+
+@app.route('/predict-jobs/<job_id>', methods=['GET'])
+def prediction_job_status(job_id):
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/predict-jobs/<job_id>/result', methods=['GET'])
+def prediction_job_result(job_id):
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job.status == JOB_DONE:
+        return Response(job.result, mimetype='application/json'), 200
+    if job.status == JOB_FAILED:
+        return jsonify({"error": job.error}), 400
+    # Queued, running or cancelled: there is no result (yet)
+    return jsonify(job.to_dict()), 409
+
+@app.route('/predict-jobs/<job_id>', methods=['DELETE'])
+def cancel_prediction_job(job_id):
+    job = prediction_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    Evaluates many what-if scenarios for one species in one request.
+    Expects the /predict fields for the species and temperatures at the top level
+    and a 'scenarios' list whose entries set any of the remaining /predict fields
+    (required_stages, start_datetime, desired_time, lab and collection windows);
+    missing fields fall back to the top-level values. The interpolation and the
+    switch table are built once and shared by every scenario.
+    """
+    try:
+        input_data = request.get_json()
+        scenarios = input_data.get('scenarios')
+        if not isinstance(scenarios, list) or not scenarios:
+            raise ValueError("Scenarios should be a non-empty list.")
+
+        shared_fields = {key: value for key, value in input_data.items() if key != 'scenarios'}
+        sanitized_scenarios = []
+        for scenario in scenarios:
+            if not isinstance(scenario, dict):
+                raise ValueError("Each scenario should be an object.")
+            # Species, temperatures and graph format always come from the top level so the tables can be shared
+            merged = {**shared_fields, **scenario}
+            merged['required_species'] = shared_fields.get('required_species')
+            merged['available_temperatures'] = shared_fields.get('available_temperatures', [])
+            merged['graph_format'] = shared_fields.get('graph_format')
+            sanitized_scenarios.append(handle_and_validate_user_input(merged))
+
+        required_species = sanitized_scenarios[0]['required_species']
+        available_temperatures = sanitized_scenarios[0]['available_temperatures']
+
+        # Switch schedules are built once for the union of all requested stages
+        all_stages = sorted({stage for scenario in sanitized_scenarios for stage in scenario['required_stages']})
+        species_grid, extended_df = build_species_tables(required_species, available_temperatures, all_stages)
+
+        with timed_step('graph_data'):
+            graph_data = prepare_graph_data(
+                species_grid, available_temperatures, sanitized_scenarios[0]['graph_format']
             )
-        else:
-            filtered_results_df = results_df
-
-        if filtered_results_df is None or filtered_results_df.empty:
-            return jsonify({"error": "No available times match the specified criteria."}), 400
+        temperature_colors = graph_data.get('temperature_colors', {})
 
-        filtered_results_df.to_csv('output02.csv', index=False)
+        trace = new_request_trace()
+        results = []
+        for index, sanitized_data in enumerate(sanitized_scenarios):
+            # Trace tables of each scenario are prefixed with its position in the list
+            scenario_trace = (lambda name, df, index=index: trace(f'{index}-{name}', df)) if trace else None
+            try:
+                results.append(run_scenario(
+                    sanitized_data, species_grid, extended_df, temperature_colors, trace=scenario_trace
+                ))
+            except ValueError as e:
+                results.append({'error': str(e)})
+
+        with timed_step('json_encode'):
+            response = jsonify({
+                'graphData': graph_data,
+                'results': results,
+            })
+        if trace:
+            response.headers['X-Trace-ID'] = trace.request_id
+        return response, 200
 
-        fastest_temp_df = suggest_fastest_temperature(filtered_results_df, required_stages)
-    
-        serializable_df = convert_df_to_serializable(fastest_temp_df)
-        
-        # Prepare graph data and schedule data for the frontend
-        graph_data = prepare_graph_data(interpolated_df, available_temperatures)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        temperature_colors = graph_data.get('temperature_colors', {})
+# Most species a single /predict-compare request may ask for
+MAX_COMPARE_SPECIES = 8
 
-        schedule_data = prepare_schedule_data(
-            serializable_df,
-            temperature_colors,
-            start_datetime=start_datetime,
-            desired_time=desired_time
-        )
+@app.route('/predict-compare', methods=['POST'])
+def predict_compare():
+    """
+    Plans the same request for several species side by side. Expects the
+    /predict fields with a 'species_list' instead of required_species. The
+    switch schedules of all species are expanded together, sharded across the
+    process pool when it is enabled. Each result holds the species and either
+    its graphData and scheduleData or an error; 'comparison' lists, per stage,
+    the shortest duration of every species that could be planned.
+    """
+    try:
+        input_data = request.get_json()
+        species_list = input_data.get('species_list')
+        if (not isinstance(species_list, list) or not species_list
+                or not all(isinstance(species, str) and species.strip() for species in species_list)):
+            raise ValueError("Species list should be a non-empty list of species names.")
+        species_list = list(dict.fromkeys(species.strip() for species in species_list))
+        if len(species_list) > MAX_COMPARE_SPECIES:
+            raise ValueError(f"At most {MAX_COMPARE_SPECIES} species can be compared at once.")
+
+        shared_fields = {key: value for key, value in input_data.items() if key != 'species_list'}
+        sanitized_species = [
+            handle_and_validate_user_input({**shared_fields, 'required_species': species})
+            for species in species_list
+        ]
+        available_temperatures = sanitized_species[0]['available_temperatures']
+        required_stages = sanitized_species[0]['required_stages']
+        temp_combinations = generate_temp_combinations(available_temperatures)
 
-        return jsonify({
-            'graphData': graph_data,
-            'scheduleData': schedule_data,
-        }), 200
+        results = {}
+        species_grids = {}
+        interpolated = {}
+        for species in species_list:
+            try:
+                with timed_step('grid') as step:
+                    species_grids[species] = get_species_grid(species)
+                    interpolated[species] = species_grids[species].frame(
+                        available_temperatures, range(switch_max_stage(required_stages) + 1)
+                    )
+                    step.rows = len(interpolated[species])
+            except ValueError as e:
+                results[species] = {'species': species, 'error': str(e)}
+
+        with timed_step('switch_expansion') as step:
+            extended = dict(zip(interpolated, calculate_switch_times_many([
+                (interpolated_df, temp_combinations, required_stages) for interpolated_df in interpolated.values()
+            ])))
+            step.rows = sum(len(extended_df) for extended_df in extended.values())
+
+        for species, sanitized_data in zip(species_list, sanitized_species):
+            if species in results:
+                continue
+            with timed_step('graph_data'):
+                graph_data = prepare_graph_data(
+                    species_grids[species], available_temperatures, sanitized_data['graph_format']
+                )
+            try:
+                scenario_result = run_scenario(
+                    sanitized_data, species_grids[species], extended[species],
+                    graph_data.get('temperature_colors', {})
+                )
+                results[species] = {'species': species, 'graphData': graph_data, **scenario_result}
+            except ValueError as e:
+                results[species] = {'species': species, 'error': str(e)}
+
+        comparison = []
+        for stage in required_stages:
+            durations = {}
+            for species in species_list:
+                stage_durations = [item['duration'] for item in results[species].get('scheduleData', [])
+                                   if item['stage'] == stage]
+                if stage_durations:
+                    durations[species] = min(stage_durations)
+            fastest = min(durations, key=durations.get) if durations else None
+            comparison.append({'stage': stage, 'fastestSpecies': fastest, 'durations': durations})
+
+        with timed_step('json_encode'):
+            response = jsonify({
+                'results': [results[species] for species in species_list],
+                'comparison': comparison,
+            })
+        return response, 200
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -129,14 +377,16 @@ def enter_data():
     input_data = request.get_json()
     rows = input_data.get('rows', [])
 
-    for row in rows:
-        species = row.get('species')
-        temperature = row.get('temperature')
-        stage = row.get('stage')
-        duration = row.get('developmentTime')
+    records = [
+        (row.get('species'), row.get('temperature'), row.get('stage'), row.get('developmentTime'))
+        for row in rows
+    ]
 
-        # Add the new data into the SQLite database
-        add_record(species, temperature, stage, duration)
+    # Validate all rows and add them to the SQLite database in one transaction
+    try:
+        add_records(records)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     # Return a success message
     return jsonify({'message': 'Data added successfully'})
@@ -144,21 +394,26 @@ def enter_data():
 # Route for getting graph data for Enter Data page
 @app.route('/get-graph-data', methods=['GET'])
 def get_graph_data():
-    data = fetch_all_data()
+    # format=columnar sends parallel x/y lists per dataset instead of point records
+    graph_format = request.args.get('format', 'records')
+    if graph_format not in GRAPH_FORMATS:
+        return jsonify({"error": "format should be 'records' or 'columnar'."}), 400
+
     # Process data to send to frontend
-    graph_data = process_graph_data(data)
-    return jsonify(graph_data)
+    return versioned_json_response(
+        f'graph-data-{graph_format}', lambda: process_graph_data(fetch_all_data(), graph_format)
+    )
 
 @app.route('/get-species', methods=['GET'])
 def get_species():
+    # Query the database for all unique species
+    def fetch_species():
+        with get_db_connection() as conn:
+            species = conn.execute('SELECT DISTINCT species FROM development_times').fetchall()
+        return [s['species'] for s in species]
+
     try:
-        # Query the database for all unique species
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT species FROM development_times')
-        species = cursor.fetchall()
-        species_list = [s['species'] for s in species]
-        return jsonify(species_list), 200
+        return versioned_json_response('species', fetch_species)
     except Exception as e:
         return jsonify({"error": "Unable to fetch species"}), 500
 
@@ -183,16 +438,53 @@ def delete_record_route():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Page size of /get-entries when limit is not given, and the largest allowed limit
+ENTRIES_PAGE_SIZE = 100
+ENTRIES_MAX_PAGE_SIZE = 1000
+
 @app.route('/get-entries', methods=['GET'])
 @jwt_required()
 def get_entries():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM development_times')
-    rows = cursor.fetchall()
-    conn.close()
-    entries = [dict(row) for row in rows]
-    return jsonify(entries), 200
+    """
+    Without query parameters returns every entry as one JSON array.
+    after_id, limit, species and temperature select one keyset page:
+    {'entries': [...], 'next_after_id': id or null}. format=ndjson streams
+    all matching entries (from after_id on) as one JSON object per line.
+    """
+    args = request.args
+    paged = any(key in args for key in ('after_id', 'limit', 'species', 'temperature'))
+    streamed = args.get('format') == 'ndjson'
+
+    if not paged and not streamed:
+        def fetch_entries():
+            with get_db_connection() as conn:
+                rows = conn.execute('SELECT * FROM development_times').fetchall()
+            return [dict(row) for row in rows]
+
+        return versioned_json_response('entries', fetch_entries)
+
+    try:
+        after_id = parse_int_arg(args, 'after_id', None)
+        limit = parse_int_arg(args, 'limit', ENTRIES_PAGE_SIZE, minimum=1, maximum=ENTRIES_MAX_PAGE_SIZE)
+        species = args.get('species')
+        temperature = args.get('temperature')
+        if temperature is not None:
+            try:
+                temperature = float(temperature)
+            except ValueError:
+                raise ValueError("temperature should be a number.")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if streamed:
+        def generate():
+            for entry in iter_entries(after_id, species, temperature):
+                yield json.dumps(entry) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    entries, next_after_id = fetch_entries_page(after_id, limit, species, temperature)
+    return jsonify({'entries': entries, 'next_after_id': next_after_id}), 200
 
 @app.route('/update-entry/<int:entry_id>', methods=['PUT'])
 @jwt_required()
@@ -203,27 +495,41 @@ def update_entry(entry_id):
     stage = data.get('stage')
     development_time_hpf = data.get('development_time_hpf')
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE development_times
-        SET species = ?, temperature = ?, stage = ?, development_time_hpf = ?
-        WHERE id = ?
-    ''', (species, temperature, stage, development_time_hpf, entry_id))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        conn.execute('''
+            UPDATE development_times
+            SET species = ?, temperature = ?, stage = ?, development_time_hpf = ?
+            WHERE id = ?
+        ''', (species, temperature, stage, development_time_hpf, entry_id))
+    bump_data_version()
     return jsonify({'message': 'Entry updated successfully'}), 200
 
 @app.route('/delete-entry/<int:entry_id>', methods=['DELETE'])
 @jwt_required()
 def delete_entry_route(entry_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM development_times WHERE id = ?', (entry_id,))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        conn.execute('DELETE FROM development_times WHERE id = ?', (entry_id,))
+    bump_data_version()
     return jsonify({'message': 'Entry deleted successfully'}), 200
 
+# Route for liveness and readiness probes
+@app.route('/health', methods=['GET'])
+def health():
+    """
+    Liveness and readiness check. The backend is started (and warmed up when
+    MEDAKA_WARMUP is on) before the first request, so answering means ready.
+    """
+    return jsonify({
+        'status': 'ok',
+        'warmup': WARMUP,
+        'warmedSpecies': len(warmed_species) if warmed_species is not None else None,
+    }), 200
+
+# Route for Prometheus scraping
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -237,121 +543,19 @@ def login():
         return jsonify({'error': 'Invalid credentials'}), 401
 
 
-# Helper function to process graph data for Enter Data page
-def process_graph_data(data):
-    # Organize data by temperature and species
-    df = pd.DataFrame(data)
-    df['species'] = df['species'].astype(str)
-    df['temperature'] = df['temperature'].astype(float)
-    df['stage'] = df['stage'].astype(float)
-    df['development_time_hpf'] = df['development_time_hpf'].astype(float)
-
-    graph_data = []
-    colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40']
-    color_index = 0
-
-    # Group data by species and temperature
-    grouped = df.groupby(['species', 'temperature'])
-    for (species, temp), group in grouped:
-        dataset = {
-            'species': species,
-            'temperature': temp,
-            'data': group[['development_time_hpf', 'stage']].to_dict(orient='records'),
-            'color': colors[color_index % len(colors)],
-        }
-        graph_data.append(dataset)
-        color_index += 1
-
-    return graph_data
-
-# Helper function to prepare graph data for Predict Stages page
-def prepare_graph_data(interpolated_df, available_temperatures):
-    """
-    Prepare graph data with all interpolated development times for the selected species 
-    across available temperatures, without filtering by required stages.
-    """
-
-    # Filter the interpolated dataframe by available temperatures
-    graph_df = interpolated_df[interpolated_df['Temperature'].isin(available_temperatures)]
-
-    # Sort the dataframe by stage and development time to get cleaner plots
-    graph_df = graph_df.sort_values(by=['Stage', 'Development_Time'])
-
-    # Unique temperatures available
-    temperatures = graph_df['Temperature'].unique()
-    
-    # Initialize graph data structure
-    graph_data = {
-        'datasets': [],
-        'temperature_colors': {}  # to store temperature to color mapping
-    }
-    
-    # Color palette for different temperatures
-    colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40']
-    
-    # Loop through each temperature and prepare dataset for plotting
-    for i, temp in enumerate(temperatures):
-        temp_df = graph_df[graph_df['Temperature'] == temp]
-        
-        color = colors[i % len(colors)]
-        graph_data['temperature_colors'][temp] = color  # Store the color mapping
-
-        dataset = {
-            'temperature': temp,
-            'data': temp_df[['Development_Time', 'Stage']].to_dict(orient='records'),
-            'color': color,
-        }
-        
-        graph_data['datasets'].append(dataset)
-
-    return graph_data
-
-# Helper function to prepare schedule data for Predict Stages page
-def prepare_schedule_data(df, temperature_colors, start_datetime=None, desired_time=None):
-    schedule_data = []
-    if df is None or df.empty:
-        return schedule_data
-
-    max_duration = df['Development_Time'].max()
-
-    for index, row in df.iterrows():
-        # Determine temperatures and colors
-        temp1 = row.get('Temp1') if 'Temp1' in row and pd.notnull(row['Temp1']) else row.get('Temperature')
-        temp2 = row.get('Temp2') if 'Temp2' in row and pd.notnull(row['Temp2']) else None
-
-        color1 = temperature_colors.get(temp1)
-        color2 = temperature_colors.get(temp2) if temp2 else None
-
-        # Assign 'startTime' and 'collectionTime' based on columns
-        startTime = row.get('Start_Time')
-        endTime = row.get('End_Time')
-
-
-        item = {
-            'stage': row['Stage'],
-            'startTime': startTime,
-            'endTime': endTime,
-            'temperature': temp1,
-            'temperature2': temp2,
-            'duration': row['Development_Time'],
-            'durationPercentage': (row['Development_Time'] / max_duration) * 100,
-            'color': color1,
-            'color2': color2,
-        }
-
-        if 'Exact_Switch_Time' in row and pd.notnull(row['Exact_Switch_Time']):
-            item['switchTime'] = row['Exact_Switch_Time']
-            # Calculate switch duration percentages
-            switch_duration = row['Switch_Times']
-            item['switchDurationPercentage'] = (switch_duration / row['Development_Time']) * 100
-            item['afterSwitchDurationPercentage'] = 100 - item['switchDurationPercentage']
-        else:
-            item['switchTime'] = None
-            item['switchDurationPercentage'] = None
-            item['afterSwitchDurationPercentage'] = None
-
-        schedule_data.append(item)
-    return schedule_data
+# Helper function to read an integer query parameter
+def parse_int_arg(args, name, default, minimum=None, maximum=None):
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} should be an integer.")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} should be between {minimum} and {maximum}." if maximum is not None
+                         else f"{name} should be at least {minimum}.")
+    return value
 
 if __name__ == '__main__':
     app.run(debug=True)
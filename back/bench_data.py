@@ -0,0 +1,36 @@
+# bench_data.py
+#
+# Synthetic development-time datasets shared by the benchmark scripts.
+
+import numpy as np
+
+
+def make_synthetic_dataset(n_temperatures=6, n_stages=41, replicates=3, min_temp=18.0, max_temp=34.0, seed=0):
+    """
+    Synthetic development times for every temperature x stage with the given
+    number of replicates: roughly power-law in stage, faster at higher
+    temperatures, with 5% replicate noise. Returns (points, values) like
+    db_handler.fetch_species_arrays.
+    """
+    rng = np.random.default_rng(seed)
+    temperatures = np.linspace(min_temp, max_temp, n_temperatures)
+    temp_mesh, stage_mesh = np.meshgrid(temperatures, np.arange(n_stages, dtype=float), indexing='ij')
+    temperature = np.repeat(temp_mesh.ravel(), replicates)
+    stage = np.repeat(stage_mesh.ravel(), replicates)
+
+    rate = np.exp(0.09 * (temperature - 26))
+    development_time = (stage ** 1.6) / rate
+    development_time *= 1 + rng.normal(0, 0.05, len(stage))
+    return np.column_stack([temperature, stage]), np.clip(development_time, 0, None)
+
+
+def make_synthetic_measurements(n_measurements, n_temperatures=8, max_stage=40, seed=0):
+    """
+    n_measurements synthetic measurements drawn at random from replicates
+    spread evenly over n_temperatures x stages 0..max_stage.
+    """
+    cells = n_temperatures * (max_stage + 1)
+    replicates = max(1, int(np.ceil(n_measurements / cells)))
+    points, values = make_synthetic_dataset(n_temperatures, max_stage + 1, replicates, seed=seed)
+    keep = np.random.default_rng(seed).permutation(len(values))[:n_measurements]
+    return points[keep], values[keep]
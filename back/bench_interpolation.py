@@ -0,0 +1,70 @@
+# bench_interpolation.py
+#
+# Compares the interpolation backends of db_handler.fit_interpolator:
+#   1. fit and evaluation time on synthetic datasets of growing size
+#   2. deviation from the global thin-plate 'rbf' output on the bundled database
+#
+# Usage: python bench_interpolation.py [measurements ...]   (default: 500 2000 5000)
+
+import sys
+import time
+import sqlite3
+
+import numpy as np
+
+from db_handler import DB_PATH, fit_interpolator
+from bench_data import make_synthetic_measurements
+
+BACKENDS = ['rbf', 'rbf_local', 'linear']
+
+
+def query_grid(temperatures, max_stage=40, min_stage=0):
+    temp_mesh, stage_mesh = np.meshgrid(temperatures, np.arange(min_stage, max_stage + 1), indexing='ij')
+    return temp_mesh.ravel(), stage_mesh.ravel()
+
+
+def time_backend(method, points, values, temps, stages):
+    start = time.perf_counter()
+    interpolator = fit_interpolator(points, values, method)
+    fitted = time.perf_counter()
+    result = interpolator(temps, stages)
+    evaluated = time.perf_counter()
+    return fitted - start, evaluated - fitted, result
+
+
+def bench_scaling(sizes):
+    temps, stages = query_grid(np.arange(18, 34.5, 0.5))
+    print(f"Fit/evaluate time on synthetic data ({len(temps)} grid cells)")
+    print(f"{'measurements':>12} {'backend':<10} {'fit [s]':>9} {'eval [s]':>9}")
+    for size in sizes:
+        points, values = make_synthetic_measurements(size)
+        for method in BACKENDS:
+            fit_time, eval_time, _ = time_backend(method, points, values, temps, stages)
+            print(f"{size:>12} {method:<10} {fit_time:>9.3f} {eval_time:>9.3f}")
+
+
+def bench_bundled_accuracy():
+    conn = sqlite3.connect(DB_PATH)
+    species_list = [row[0] for row in conn.execute('SELECT DISTINCT species FROM development_times')]
+    print(f"\nDeviation from 'rbf' on {DB_PATH} (hours, measured temperatures x measured stage range)")
+    print(f"{'species':<26} {'backend':<10} {'max':>8} {'mean':>8}")
+    for species in species_list:
+        rows = conn.execute(
+            'SELECT temperature, stage, development_time_hpf FROM development_times WHERE species = ?', (species,)
+        ).fetchall()
+        data = np.array(rows, dtype=float)
+        points, values = data[:, :2], data[:, 2]
+        # Stay inside the measured range: outside it the global fit extrapolates freely
+        temps, stages = query_grid(np.unique(points[:, 0]), int(points[:, 1].max()), int(points[:, 1].min()))
+        _, _, reference = time_backend('rbf', points, values, temps, stages)
+        for method in BACKENDS[1:]:
+            _, _, result = time_backend(method, points, values, temps, stages)
+            deviation = np.abs(result - reference)
+            print(f"{species[:26]:<26} {method:<10} {deviation.max():>8.2f} {deviation.mean():>8.2f}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 5000]
+    bench_scaling(sizes)
+    bench_bundled_accuracy()
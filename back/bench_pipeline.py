@@ -0,0 +1,168 @@
+# bench_pipeline.py
+#
+# Times every step of the /predict pipeline in isolation on a synthetic dataset
+# and writes the results to JSON, so runs before and after a change can be compared.
+#
+# Usage:
+#   python bench_pipeline.py --temperatures 8 --replicates 5 --output after.json --compare before.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the /predict pipeline step by step.")
+    parser.add_argument('--temperatures', type=int, default=6, help="measured temperatures in the synthetic dataset")
+    parser.add_argument('--stages', type=int, default=41, help="measured stages (0..stages-1)")
+    parser.add_argument('--replicates', type=int, default=3, help="replicate timings per temperature and stage")
+    parser.add_argument('--available-temperatures', default='22,24,26,28,30,32',
+                        help="comma-separated temperatures requested from the planner")
+    parser.add_argument('--required-stages', default='10,20,30,40', help="comma-separated required stages")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per step")
+    parser.add_argument('--output', default='bench_pipeline.json', help="where to write the JSON results")
+    parser.add_argument('--compare', help="earlier JSON results to compare against")
+    return parser.parse_args(argv)
+
+
+def time_step(func, repeat):
+    """
+    Runs func repeat times and returns (timings in seconds, last result).
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def row_count(result):
+    if isinstance(result, tuple):
+        # (points, values) pairs: count the values
+        result = result[-1]
+    if hasattr(result, '__len__'):
+        return len(result)
+    return None
+
+
+def main(argv):
+    args = parse_args(argv)
+    available_temperatures = [float(t) for t in args.available_temperatures.split(',')]
+    required_stages = [int(s) for s in args.required_stages.split(',')]
+    species = 'Synthetic'
+
+    # Work on a throwaway database so the bundled one is never touched
+    work_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.environ['MEDAKA_DB_PATH'] = os.path.join(work_dir, 'bench.db')
+    os.environ.setdefault('MEDAKA_TRACE_MODE', 'off')
+
+    from bench_data import make_synthetic_dataset
+    from db_handler import (
+        migrate_database, add_records, fetch_all_data, fetch_species_arrays, prepare_data,
+        fit_interpolator, create_interpolated_dataset, INTERPOLATION_METHOD,
+    )
+    from grid_handler import refresh_stale_grids, get_species_grid
+
+    points, values = make_synthetic_dataset(args.temperatures, args.stages, args.replicates)
+    migrate_database()
+    add_records([(species, t, int(s), v) for (t, s), v in zip(points, values)])
+    # Build the stored grid up front so the background refresher stays idle while timing
+    refresh_stale_grids()
+
+    from analysis import (
+        LazyGrid, generate_temp_combinations, calculate_switch_times, calculate_start_times, calculate_end_times,
+        filter_results_by_timing, suggest_fastest_temperature, convert_df_to_serializable,
+    )
+    from pipeline_handler import prepare_graph_data, prepare_schedule_data
+
+    start_datetime = datetime(2024, 9, 17, 10, 0)
+    desired_time = datetime(2024, 9, 27, 10, 0)
+    lab_days, lab_start, lab_end = [0, 1, 2, 3, 4], '08:00', '18:00'
+    max_stage = 40
+
+    results = {}
+
+    def record(name, func):
+        timings, result = time_step(func, args.repeat)
+        results[name] = {
+            'min_s': min(timings),
+            'median_s': float(np.median(timings)),
+            'rows': row_count(result),
+        }
+        print(f"{name:<30} {min(timings) * 1000:>10.2f} ms  {float(np.median(timings)) * 1000:>10.2f} ms  rows={row_count(result)}")
+        return result
+
+    print(f"{'step':<30} {'min':>13}  {'median':>13}")
+    record('fetch_species_arrays', lambda: fetch_species_arrays(species))
+    all_rows = fetch_all_data()
+    record('prepare_data', lambda: prepare_data(all_rows))
+    interpolator = record('fit_interpolator', lambda: fit_interpolator(points, values, INTERPOLATION_METHOD))
+    interpolated_df = record('create_interpolated_dataset', lambda: create_interpolated_dataset(
+        points, values, method=INTERPOLATION_METHOD, available_temperatures=available_temperatures,
+        max_stage=max_stage, interpolator=interpolator
+    ))
+    # A fresh LazyGrid evaluates every cell; the shared species grid reads stored or memoized cells
+    record('lazy_grid_evaluate', lambda: LazyGrid(interpolator, max_stage).frame(available_temperatures))
+    record('get_species_grid', lambda: get_species_grid(species).frame(available_temperatures))
+    temp_combinations = record('generate_temp_combinations', lambda: generate_temp_combinations(available_temperatures))
+    extended_df = record('calculate_switch_times', lambda: calculate_switch_times(
+        interpolated_df, temp_combinations, required_stages
+    ))
+    record('calculate_start_times', lambda: calculate_start_times(
+        extended_df, required_stages, available_temperatures, desired_time
+    ))
+    results_df = record('calculate_end_times', lambda: calculate_end_times(
+        extended_df, required_stages, available_temperatures, start_datetime
+    ))
+    filtered_df = record('filter_results_by_timing', lambda: filter_results_by_timing(
+        results_df, lab_days, lab_start, lab_end, None, None, start_datetime, None
+    ))
+    if filtered_df is None:
+        filtered_df = results_df
+    fastest_df = record('suggest_fastest_temperature', lambda: suggest_fastest_temperature(filtered_df, required_stages))
+    serializable_df = record('convert_df_to_serializable', lambda: convert_df_to_serializable(fastest_df))
+    graph_data = record('prepare_graph_data', lambda: prepare_graph_data(interpolated_df, available_temperatures))
+    record('prepare_schedule_data', lambda: prepare_schedule_data(
+        serializable_df, graph_data['temperature_colors'], start_datetime=start_datetime
+    ))
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': {
+            'temperatures': args.temperatures,
+            'stages': args.stages,
+            'replicates': args.replicates,
+            'measurements': len(values),
+            'available_temperatures': available_temperatures,
+            'required_stages': required_stages,
+            'interpolation_method': INTERPOLATION_METHOD,
+            'repeat': args.repeat,
+        },
+        'steps': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)['steps']
+        print(f"\n{'step':<30} {'before':>12} {'after':>12} {'ratio':>8}")
+        for name, current in results.items():
+            if name in previous:
+                before, after = previous[name]['median_s'], current['median_s']
+                print(f"{name:<30} {before * 1000:>9.2f} ms {after * 1000:>9.2f} ms {after / before:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
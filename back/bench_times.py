@@ -0,0 +1,81 @@
+# bench_times.py
+#
+# Benchmark of calculate_start_times / calculate_end_times against the previous
+# row-by-row implementation (DataFrame.apply with a Python timedelta per row).
+#
+# Usage: python bench_times.py [rows ...]   (default: 10000 100000 1000000)
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from analysis import calculate_start_times, calculate_end_times
+
+
+def make_extended_df(rows, seed=0):
+    # Synthetic extended switch table: half the rows carry a temperature switch
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Temperature': rng.choice([24.0, 26.0, 28.0, 30.0], rows),
+        'Stage': rng.integers(0, 41, rows),
+        'Development_Time': rng.random(rows) * 300,
+        'Switch': rng.random(rows) < 0.5,
+        'Switch_Times': np.where(rng.random(rows) < 0.5, np.nan, rng.random(rows) * 100),
+    })
+
+
+# Previous implementation, kept here only as the benchmark baseline
+def rowwise_start_times(df, desired_time):
+    df = df.copy()
+    df['End_Time'] = desired_time
+    df['Start_Time'] = df.apply(
+        lambda row: desired_time - timedelta(hours=row['Development_Time']), axis=1
+    )
+    df['Exact_Switch_Time'] = df.apply(
+        lambda row: row['Start_Time'] + timedelta(hours=row['Switch_Times']) if pd.notnull(row['Switch_Times']) else np.nan, axis=1
+    )
+    return df
+
+
+def rowwise_end_times(df, start_datetime):
+    df = df.copy()
+    df['End_Time'] = df.apply(
+        lambda row: start_datetime + timedelta(hours=row['Development_Time']), axis=1
+    )
+    df['Start_Time'] = start_datetime
+    df['Exact_Switch_Time'] = df.apply(
+        lambda row: start_datetime + timedelta(hours=row['Switch_Times']) if pd.notnull(row['Switch_Times']) else np.nan, axis=1
+    )
+    return df
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    stages = list(range(0, 41))
+    temperatures = [24.0, 26.0, 28.0, 30.0]
+    reference_time = datetime(2024, 9, 17, 10, 0)
+
+    print(f"{'rows':>10} {'function':<22} {'row-wise [s]':>13} {'vectorized [s]':>15} {'speedup':>9}")
+    for rows in sizes:
+        df = make_extended_df(rows)
+        cases = [
+            ('calculate_start_times', rowwise_start_times, calculate_start_times),
+            ('calculate_end_times', rowwise_end_times, calculate_end_times),
+        ]
+        for name, rowwise, vectorized in cases:
+            old = timed(rowwise, df, reference_time)
+            new = timed(vectorized, df, stages, temperatures, reference_time)
+            print(f"{rows:>10} {name:<22} {old:>13.3f} {new:>15.4f} {old / new:>8.0f}x")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    main(sizes)
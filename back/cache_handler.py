@@ -0,0 +1,92 @@
+# cache_handler.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from metrics_handler import Counter
+
+# Responses kept by the /predict result cache (0 disables it) and their lifetime in seconds
+RESULT_CACHE_SIZE = int(os.environ.get('MEDAKA_RESULT_CACHE_SIZE', '256'))
+RESULT_CACHE_TTL = float(os.environ.get('MEDAKA_RESULT_CACHE_TTL', '600'))
+
+CACHE_LOOKUPS = Counter(
+    'medaka_result_cache_lookups_total', 'Result cache lookups by outcome.', 'result'
+)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache whose entries also expire ttl seconds after they were stored.
+    """
+    def __init__(self, max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value or None on a miss or an expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                CACHE_LOOKUPS.inc('miss')
+                return None
+            self._entries.move_to_end(key)
+            CACHE_LOOKUPS.inc('hit')
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Function to build the cache key of a /predict request
+def result_cache_key(sanitized_data, version):
+    """
+    Hashes the sanitized input of handle_and_validate_user_input together with
+    the species data version. Lab days and temperatures are sorted (their order
+    does not change the result) and datetimes are written in ISO format; stage
+    order is kept because the schedule follows it.
+    """
+    canonical = {
+        'required_species': sanitized_data['required_species'],
+        'required_stages': list(sanitized_data['required_stages']),
+        'available_temperatures': sorted(float(t) for t in sanitized_data['available_temperatures']),
+        'start_datetime': normalize_datetime(sanitized_data['start_datetime']),
+        'desired_time': normalize_datetime(sanitized_data['desired_time']),
+        'collection_start': sanitized_data['collection_start'],
+        'collection_end': sanitized_data['collection_end'],
+        'lab_days': sorted(set(sanitized_data['lab_days'])),
+        'lab_start_time': sanitized_data['lab_start_time'],
+        'lab_end_time': sanitized_data['lab_end_time'],
+        'lab_hours': sorted((day, windows) for day, windows in (sanitized_data['lab_hours'] or {}).items()),
+        'max_switches': sanitized_data['max_switches'],
+        'search_start': normalize_datetime(sanitized_data['search_start']),
+        'search_days': sanitized_data['search_days'],
+        'search_step_minutes': sanitized_data['search_step_minutes'],
+        'graph_format': sanitized_data['graph_format'],
+        'data_version': version,
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def normalize_datetime(value):
+    return value.isoformat(timespec='minutes') if value is not None else None
@@ -1,38 +1,323 @@
 # db_handler.py
 
+import os
 import sqlite3
+import time
+import threading
+import warnings
+from contextlib import contextmanager
 import numpy as np
-import pandas as pd
-from scipy.interpolate import Rbf
+from metrics_handler import observe_step, timed_step
 
-# Connect to the SQLite database
-def get_db_connection():
-    conn = sqlite3.connect('medaka_development.db')
+# pandas and SciPy are imported inside the functions that need them, so the seed
+# loader, the CLI and health checks can use this module without loading them.
+
+_interpolator_cache = {}
+_cache_lock = threading.Lock()
+_write_listeners = []
+
+# Database location, overridable with the MEDAKA_DB_PATH environment variable
+DB_PATH = os.environ.get(
+    'MEDAKA_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'medaka_development.db')
+)
+# Seconds a connection waits on a locked database before raising
+DB_BUSY_TIMEOUT = float(os.environ.get('MEDAKA_DB_BUSY_TIMEOUT', '5'))
+
+# Interpolation backend: 'rbf' (global thin-plate), 'rbf_local' (thin-plate on the
+# nearest RBF_NEIGHBORS measurements), 'linear' (piecewise linear on replicate means)
+# or 'auto' ('rbf' up to AUTO_GLOBAL_RBF_LIMIT measurements, 'rbf_local' above)
+INTERPOLATION_METHOD = os.environ.get('MEDAKA_INTERPOLATION_METHOD', 'auto')
+RBF_NEIGHBORS = int(os.environ.get('MEDAKA_RBF_NEIGHBORS', '64'))
+AUTO_GLOBAL_RBF_LIMIT = 2000
+INTERPOLATION_METHODS = ('auto', 'rbf', 'rbf_local', 'linear')
+
+# One reusable connection per thread
+_local = threading.local()
+
+def configure_database(path):
+    """
+    Point the connection manager at another database file. Connections
+    opened for the previous path are replaced on their next use.
+    """
+    global DB_PATH
+    DB_PATH = path
+
+def open_connection(path):
+    """
+    Open a connection in WAL mode, so readers do not block behind writers.
+    """
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    # NORMAL is durable across application crashes in WAL mode and avoids an fsync per commit
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}')
     return conn
 
+def thread_connection():
+    """
+    Return this thread's connection, opening it on first use, after the
+    database path changed or in a forked child process.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != DB_PATH or _local.pid != os.getpid():
+        if conn is not None and _local.pid == os.getpid():
+            conn.close()
+        conn = open_connection(DB_PATH)
+        _local.conn = conn
+        _local.path = DB_PATH
+        _local.pid = os.getpid()
+        _local.depth = 0
+    return conn
+
+# Connect to the SQLite database
+@contextmanager
+def get_db_connection():
+    """
+    Context manager yielding the thread's pooled connection. The outermost
+    block commits on success and rolls back on error; nested blocks join the
+    enclosing transaction. The connection stays open for reuse.
+    """
+    conn = thread_connection()
+    _local.depth += 1
+    start = time.perf_counter()
+    try:
+        yield conn
+        if _local.depth == 1:
+            conn.commit()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+        # Outermost blocks are reported as the 'db' step
+        if _local.depth == 0:
+            observe_step('db', time.perf_counter() - start)
+
+# Bring an existing database up to the current schema (safe to run on every startup)
+def migrate_database():
+    """
+    Creates the measurements table if missing, the species index, the
+    per-species version counters with the triggers that maintain them, and
+    the materialized interpolation grid table.
+    """
+    with get_db_connection() as conn:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS development_times (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                species TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                stage INTEGER NOT NULL,
+                development_time_hpf REAL NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_development_times_species
+            ON development_times (species, temperature, stage);
+
+            CREATE TABLE IF NOT EXISTS data_versions (
+                species TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            );
+
+            INSERT OR IGNORE INTO data_versions (species, version)
+            SELECT DISTINCT species, 0 FROM development_times;
+
+            CREATE TRIGGER IF NOT EXISTS development_times_version_insert
+            AFTER INSERT ON development_times
+            BEGIN
+                INSERT INTO data_versions (species, version) VALUES (NEW.species, 1)
+                ON CONFLICT (species) DO UPDATE SET version = version + 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS development_times_version_update
+            AFTER UPDATE ON development_times
+            BEGIN
+                INSERT INTO data_versions (species, version) VALUES (OLD.species, 1)
+                ON CONFLICT (species) DO UPDATE SET version = version + 1;
+                INSERT INTO data_versions (species, version) VALUES (NEW.species, 1)
+                ON CONFLICT (species) DO UPDATE SET version = version + 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS development_times_version_delete
+            AFTER DELETE ON development_times
+            BEGIN
+                INSERT INTO data_versions (species, version) VALUES (OLD.species, 1)
+                ON CONFLICT (species) DO UPDATE SET version = version + 1;
+            END;
+
+            CREATE TABLE IF NOT EXISTS interpolated_grid (
+                species TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                stage INTEGER NOT NULL,
+                development_time REAL NOT NULL,
+                data_version INTEGER NOT NULL,
+                method TEXT NOT NULL,
+                PRIMARY KEY (species, temperature, stage)
+            );
+        ''')
+
+# Persistent version of one species' measurements, bumped by triggers on every write
+def get_species_version(species):
+    with get_db_connection() as conn:
+        row = conn.execute('SELECT version FROM data_versions WHERE species = ?', (species,)).fetchone()
+    return row['version'] if row else 0
+
+# Persistent version of the whole measurements table
+def get_table_version():
+    """
+    Sum of the per-species versions. Every write bumps at least one of them
+    and rows are never removed, so the sum changes on every write, including
+    writes from other processes.
+    """
+    with get_db_connection() as conn:
+        row = conn.execute('SELECT COALESCE(SUM(version), 0) AS version FROM data_versions').fetchone()
+    return row['version']
+
 # Add a new record to the database
 def add_record(species, temperature, stage, development_time_hpf):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO development_times (species, temperature, stage, development_time_hpf)
-        VALUES (?, ?, ?, ?)
-    ''', (species, temperature, stage, development_time_hpf))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        conn.execute('''
+            INSERT INTO development_times (species, temperature, stage, development_time_hpf)
+            VALUES (?, ?, ?, ?)
+        ''', (species, temperature, stage, development_time_hpf))
+    bump_data_version()
+
+# Validate and normalize one (species, temperature, stage, development_time_hpf) record
+def validate_record(species, temperature, stage, development_time_hpf):
+    """
+    Return the record with numeric fields converted to float/int.
+    Numeric strings (as sent by the Enter Data form) are accepted.
+    Raises ValueError describing the first invalid field.
+    """
+    if not isinstance(species, str) or not species.strip():
+        raise ValueError("Invalid species value.")
+
+    try:
+        temperature = float(temperature)
+        stage_value = float(stage)
+        development_time_hpf = float(development_time_hpf)
+    except (TypeError, ValueError):
+        raise ValueError("Temperature, stage and development time must be numbers.")
+
+    if not np.isfinite(temperature):
+        raise ValueError("Invalid temperature value.")
+    if not stage_value.is_integer() or stage_value < 0:
+        raise ValueError("Stage should be a non-negative integer.")
+    if not np.isfinite(development_time_hpf) or development_time_hpf < 0:
+        raise ValueError("Development time should be a non-negative number.")
+
+    return species.strip(), temperature, int(stage_value), development_time_hpf
+
+# Add many records in a single transaction
+def add_records(records):
+    """
+    Validate a batch of (species, temperature, stage, development_time_hpf)
+    records and insert them with one executemany and one commit. If any
+    record is invalid nothing is written and a ValueError naming the row
+    (0-based) is raised. Returns the number of inserted rows.
+    """
+    validated = []
+    for index, record in enumerate(records):
+        try:
+            validated.append(validate_record(*record))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Row {index}: {e}")
+
+    if not validated:
+        return 0
+
+    with get_db_connection() as conn:
+        conn.executemany('''
+            INSERT INTO development_times (species, temperature, stage, development_time_hpf)
+            VALUES (?, ?, ?, ?)
+        ''', validated)
+    bump_data_version()
+    return len(validated)
 
 # Fetch all data from the database
 def fetch_all_data():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM development_times')
-    rows = cursor.fetchall()
-    conn.close()
+    with get_db_connection() as conn:
+        rows = conn.execute('SELECT * FROM development_times').fetchall()
     data = [dict(row) for row in rows]
     return data
 
+# Fetch the measurements of one species as interpolation-ready NumPy arrays
+def fetch_species_arrays(species):
+    """
+    Return (points, values) for a single species, where points is an (N, 2)
+    array of [temperature, stage] and values the N development times.
+    Uses the (species, temperature, stage) index, so the cost depends on the
+    size of the species and not of the whole table.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples convert straight into an array
+        cursor.execute('''
+            SELECT temperature, stage, development_time_hpf
+            FROM development_times
+            WHERE species = ?
+        ''', (species,))
+        rows = cursor.fetchall()
+    data = np.array(rows, dtype=float).reshape(-1, 3)
+    return data[:, :2], data[:, 2]
+
+# Build the WHERE clause shared by the entry listing queries
+def entries_filter(after_id=None, species=None, temperature=None):
+    conditions = ['1 = 1']
+    params = []
+    if after_id is not None:
+        conditions.append('id > ?')
+        params.append(after_id)
+    if species is not None:
+        conditions.append('species = ?')
+        params.append(species)
+    if temperature is not None:
+        conditions.append('temperature = ?')
+        params.append(temperature)
+    return ' AND '.join(conditions), params
+
+# Fetch one page of entries in id order, starting after after_id
+def fetch_entries_page(after_id=None, limit=100, species=None, temperature=None):
+    """
+    Keyset pagination over development_times: returns up to limit rows with
+    id > after_id (from the first row when after_id is None), optionally
+    filtered by species and temperature, and the id to pass as after_id for
+    the next page, or None on the last page.
+    """
+    where, params = entries_filter(after_id, species, temperature)
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            f'SELECT * FROM development_times WHERE {where} ORDER BY id LIMIT ?', (*params, limit + 1)
+        ).fetchall()
+    entries = [dict(row) for row in rows[:limit]]
+    next_after_id = entries[-1]['id'] if len(rows) > limit else None
+    return entries, next_after_id
+
+# Yield entries in id order straight from the cursor
+def iter_entries(after_id=None, species=None, temperature=None, batch_size=500):
+    """
+    Generator over the matching rows as dicts, read batch_size rows at a time
+    on a dedicated connection, so a full export never holds the whole table
+    in memory. The connection is closed when the generator finishes or is
+    closed.
+    """
+    where, params = entries_filter(after_id, species, temperature)
+    conn = open_connection(DB_PATH)
+    try:
+        cursor = conn.execute(f'SELECT * FROM development_times WHERE {where} ORDER BY id', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        conn.close()
+
 def prepare_data(data):
+    import pandas as pd
     data_list = []
     for entry in data:
         temperature = float(entry['temperature'])
@@ -52,23 +337,132 @@ def delete_record(species, temperature, stage, development_time_hpf):
     """
     Delete a record from the database based on species, temperature, stage, and development time.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Define the DELETE SQL statement with development_time included; committed when the block exits
+    with get_db_connection() as conn:
+        conn.execute('''
+            DELETE FROM development_times
+            WHERE species = ? AND temperature = ? AND stage = ? AND development_time_hpf = ?
+        ''', (species, temperature, stage, development_time_hpf))
+    bump_data_version()
 
-    # Define the DELETE SQL statement with development_time included
-    cursor.execute('''
-        DELETE FROM development_times
-        WHERE species = ? AND temperature = ? AND stage = ? AND development_time_hpf = ?
-    ''', (species, temperature, stage, development_time_hpf))
+    print(f"Record deleted: Species: {species}, Temperature: {temperature}, Stage: {stage}, Development Time: {development_time_hpf}")
 
-    # Commit the transaction and close the connection
-    conn.commit()
-    conn.close()
 
-    print(f"Record deleted: Species: {species}, Temperature: {temperature}, Stage: {stage}, Development Time: {development_time_hpf}")
+def bump_data_version():
+    """
+    Mark the stored measurements as changed and drop all cached interpolators.
+    Must be called after every write to the development_times table.
+    """
+    with _cache_lock:
+        _interpolator_cache.clear()
+    for listener in _write_listeners:
+        listener()
+
+
+def add_write_listener(listener):
+    """
+    Register a callable invoked (without arguments) after every data write.
+    """
+    _write_listeners.append(listener)
+
+
+class PointArrayInterpolator:
+    """
+    Adapts models evaluated on an (M, 2) point array to the
+    interpolator(temperatures, stages) call used for the legacy Rbf.
+    """
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, temperatures, stages):
+        query = np.column_stack([np.asarray(temperatures, dtype=float), np.asarray(stages, dtype=float)])
+        return self.model(query)
+
+
+def fit_linear_interpolator(points, values):
+    """
+    Piecewise linear interpolation over the mean of each (temperature, stage)
+    replicate group, with nearest-neighbour values outside the convex hull.
+    """
+    from scipy.interpolate import LinearNDInterpolator, NearestNDInterpolator
+    from scipy.spatial import QhullError
+
+    unique_points, inverse = np.unique(points, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    means = np.bincount(inverse, weights=values) / np.bincount(inverse)
+
+    nearest = NearestNDInterpolator(unique_points, means)
+    try:
+        linear = LinearNDInterpolator(unique_points, means)
+    except QhullError:
+        # All points on one line: no triangulation possible
+        return PointArrayInterpolator(nearest)
+
+    def evaluate(query):
+        result = linear(query)
+        outside = np.isnan(result)
+        if outside.any():
+            result[outside] = nearest(query[outside])
+        return result
+
+    return PointArrayInterpolator(evaluate)
+
+
+def fit_interpolator(points, values, method='rbf', neighbors=None):
+    """
+    Fit the interpolation model on (temperature, stage) -> development time.
+    The method is one of INTERPOLATION_METHODS; see INTERPOLATION_METHOD.
+    Every backend returns a callable interpolator(temperatures, stages).
+    """
+    from scipy.interpolate import Rbf, RBFInterpolator
+
+    if method == 'auto':
+        method = 'rbf' if len(points) <= AUTO_GLOBAL_RBF_LIMIT else 'rbf_local'
+
+    if method == 'rbf':
+        return Rbf(points[:, 0], points[:, 1], values, function='thin_plate', smooth=0.2)
+
+    if method == 'rbf_local':
+        # Same system as the legacy Rbf (no polynomial term, its smooth=0.2 is
+        # subtracted from the diagonal) but solved per neighbourhood
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            model = RBFInterpolator(
+                points, values, kernel='thin_plate_spline', smoothing=-0.2, degree=-1,
+                neighbors=neighbors or RBF_NEIGHBORS
+            )
+        return PointArrayInterpolator(model)
+
+    if method == 'linear':
+        return fit_linear_interpolator(points, values)
+
+    raise ValueError(f"Unknown interpolation method: {method}")
+
+
+def get_cached_interpolator(species, points, values, version, method='rbf'):
+    """
+    Return the fitted interpolator for a species, refitting only when the
+    species version has changed since it was cached. The version must be read
+    with get_species_version() before the points were fetched, so a cached fit
+    is never older than the version it is stored under.
+    """
+    key = (species, method)
+    with _cache_lock:
+        cached = _interpolator_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with timed_step('interpolation_fit') as step:
+        interpolator = fit_interpolator(points, values, method)
+        step.rows = len(values)
+    with _cache_lock:
+        _interpolator_cache[key] = (version, interpolator)
+    return interpolator
+
 
+def create_interpolated_dataset(points, values, method='rbf', available_temperatures=None, max_stage=None, interpolator=None):
+    import pandas as pd
 
-def create_interpolated_dataset(points, values, method='rbf', available_temperatures=None, max_stage=None):
     # Include available temperatures in the grid
     if available_temperatures is not None and len(available_temperatures) > 0:
         temperatures = np.array(sorted(set(available_temperatures)))
@@ -88,11 +482,14 @@ def create_interpolated_dataset(points, values, method='rbf', available_temperat
     temps_flat = temp_mesh.ravel()
     stages_flat = stage_mesh.ravel()
 
-    # Use RBF interpolation
-    rbf_interpolator = Rbf(points[:, 0], points[:, 1], values, function='thin_plate', smooth=0.2)
+    # Use RBF interpolation, reusing a previously fitted model when given
+    if interpolator is None:
+        interpolator = fit_interpolator(points, values, method)
 
     # Interpolate values
-    interpolated_values = rbf_interpolator(temps_flat, stages_flat)
+    with timed_step('grid_evaluation') as step:
+        interpolated_values = interpolator(temps_flat, stages_flat)
+        step.rows = len(interpolated_values)
 
     # Set negative interpolated values to zero
     interpolated_values = np.where(interpolated_values < 0, 0, interpolated_values)
@@ -0,0 +1,259 @@
+# grid_handler.py
+
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from db_handler import (
+    get_db_connection,
+    get_species_version,
+    fetch_species_arrays,
+    get_cached_interpolator,
+    create_interpolated_dataset,
+    add_write_listener,
+    INTERPOLATION_METHOD,
+)
+from metrics_handler import timed_step
+from analysis import LazyGrid
+
+# Temperatures precomputed for every species; other temperatures are evaluated lazily by get_species_grid
+GRID_TEMPERATURES = np.arange(18.0, 34.5, 0.5)
+GRID_MAX_STAGE = 40
+# Fit every species' interpolator and build its grid before the process serves requests (off by default)
+WARMUP = os.environ.get('MEDAKA_WARMUP', 'off') == 'on'
+# Species whose lazily evaluated grids are kept in memory, least recently used dropped first
+SPECIES_GRID_CACHE_SIZE = int(os.environ.get('MEDAKA_SPECIES_GRID_CACHE_SIZE', '32'))
+
+_refresh_event = threading.Event()
+_refresher_lock = threading.Lock()
+_refresher = None
+_listener_registered = False
+_species_grids = OrderedDict()
+_species_grids_lock = threading.Lock()
+
+
+# Function to get the fitted interpolator of one species
+def species_interpolator(species):
+    """
+    Returns (points, values, interpolator, version), fitting the interpolator
+    only when the species data changed since it was cached.
+    Raises ValueError when the species has too little data to interpolate.
+    """
+    version = get_species_version(species)
+    points, values = fetch_species_arrays(species)
+
+    if not points.size or not values.size:
+        raise ValueError("No valid data for interpolation.")
+    if len(np.unique(points, axis=0)) < 3:
+        raise ValueError("Not enough unique data points for interpolation")
+
+    interpolator = get_cached_interpolator(species, points, values, version, method=INTERPOLATION_METHOD)
+    return points, values, interpolator, version
+
+
+# Function to evaluate the interpolation for one species, bypassing the stored grid
+def compute_interpolated_grid(species, temperatures, max_stage):
+    """
+    Fits (or reuses) the species interpolator and evaluates it on
+    temperatures x stages 0..max_stage. Returns the interpolated DataFrame and
+    the species version it was computed from.
+    Raises ValueError when the species has too little data to interpolate.
+    """
+    points, values, interpolator, version = species_interpolator(species)
+
+    interpolated_df = create_interpolated_dataset(
+        points,
+        values,
+        method=INTERPOLATION_METHOD,
+        available_temperatures=temperatures,
+        max_stage=max_stage,
+        interpolator=interpolator
+    )
+    return interpolated_df, version
+
+
+# Function to write grid rows stamped with the version they were computed from
+def store_grid_rows(species, interpolated_df, version):
+    """
+    Replaces the stored grid of the species with the rows of an interpolated DataFrame.
+    """
+    rows = zip(
+        [species] * len(interpolated_df),
+        interpolated_df['Temperature'].astype(float),
+        interpolated_df['Stage'].astype(int),
+        interpolated_df['Development_Time'].astype(float),
+        [version] * len(interpolated_df),
+        [INTERPOLATION_METHOD] * len(interpolated_df),
+    )
+    with get_db_connection() as conn:
+        conn.execute('DELETE FROM interpolated_grid WHERE species = ?', (species,))
+        conn.executemany('''
+            INSERT OR REPLACE INTO interpolated_grid
+                (species, temperature, stage, development_time, data_version, method)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+
+# Function to read the stored grid cells of the given temperatures at the given version
+def load_grid_rows(species, temperatures, max_stage, version):
+    placeholders = ', '.join('?' for _ in temperatures)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f'''
+            SELECT temperature, stage, development_time
+            FROM interpolated_grid
+            WHERE species = ? AND data_version = ? AND method = ?
+              AND stage <= ? AND temperature IN ({placeholders})
+            ORDER BY temperature, stage
+        ''', (species, version, INTERPOLATION_METHOD, max_stage, *[float(t) for t in temperatures]))
+        rows = cursor.fetchall()
+    return np.array(rows, dtype=float).reshape(-1, 3)
+
+
+# Function to get the lazily evaluated grid of one species
+def get_species_grid(species):
+    """
+    Returns the species' LazyGrid for its current data, shared by all
+    requests until the data changes. Cells are read from the stored grid
+    where it has them; any other cell, including fractional temperatures
+    outside GRID_TEMPERATURES, is evaluated on first use and memoized. The
+    interpolator is only fitted once a cell has to be evaluated, which raises
+    ValueError when the species has too little data. Species that have never
+    had data raise ValueError right away and are not cached.
+    """
+    version = get_species_version(species)
+    with _species_grids_lock:
+        cached = _species_grids.get(species)
+        if cached is not None and cached[0] == version:
+            _species_grids.move_to_end(species)
+            return cached[1]
+    if not species_is_known(species):
+        raise ValueError("No valid data for interpolation.")
+
+    if not grid_is_current(species, version):
+        # Stale or never built: let the refresher rebuild it, evaluate cells directly meanwhile
+        request_grid_refresh()
+
+    def load(temperatures):
+        return load_grid_rows(species, temperatures, GRID_MAX_STAGE, version)
+
+    def evaluate(temperatures, stages):
+        interpolator = species_interpolator(species)[2]
+        with timed_step('grid_evaluation') as step:
+            values = interpolator(temperatures, stages)
+            step.rows = len(values)
+        return values
+
+    grid = LazyGrid(evaluate, GRID_MAX_STAGE, load=load)
+    with _species_grids_lock:
+        _species_grids[species] = (version, grid)
+        _species_grids.move_to_end(species)
+        while len(_species_grids) > SPECIES_GRID_CACHE_SIZE:
+            _species_grids.popitem(last=False)
+    return grid
+
+
+# Function to check whether the species has ever had data (it then has a data_versions row)
+def species_is_known(species):
+    with get_db_connection() as conn:
+        row = conn.execute('SELECT 1 FROM data_versions WHERE species = ?', (species,)).fetchone()
+    return row is not None
+
+
+# Function to check whether any grid rows exist for the species' current data
+def grid_is_current(species, version):
+    with get_db_connection() as conn:
+        row = conn.execute('''
+            SELECT 1 FROM interpolated_grid
+            WHERE species = ? AND data_version = ? AND method = ?
+            LIMIT 1
+        ''', (species, version, INTERPOLATION_METHOD)).fetchone()
+    return row is not None
+
+
+# Function to rebuild the stored grid of every species whose data changed
+def refresh_stale_grids():
+    """
+    Rebuilds the GRID_TEMPERATURES grid of each species without rows at its
+    current version and drops the grids of species that no longer have data.
+    """
+    with get_db_connection() as conn:
+        stale_species = [row['species'] for row in conn.execute('''
+            SELECT v.species FROM data_versions v
+            WHERE NOT EXISTS (
+                SELECT 1 FROM interpolated_grid g
+                WHERE g.species = v.species AND g.data_version = v.version AND g.method = ?
+            )
+        ''', (INTERPOLATION_METHOD,))]
+        conn.execute('''
+            DELETE FROM interpolated_grid
+            WHERE species NOT IN (SELECT DISTINCT species FROM development_times)
+        ''')
+
+    for species in stale_species:
+        try:
+            interpolated_df, version = compute_interpolated_grid(species, GRID_TEMPERATURES, GRID_MAX_STAGE)
+        except ValueError:
+            # Not enough data to interpolate this species
+            continue
+        store_grid_rows(species, interpolated_df, version)
+
+
+# Function to prepare every species before the process serves requests
+def warm_up():
+    """
+    Rebuilds stale stored grids and fits the interpolator of every species, so
+    the first request for a species neither interpolates nor fits. Returns the
+    species that were warmed; species with too little data are skipped.
+    """
+    start = time.perf_counter()
+    refresh_stale_grids()
+    with get_db_connection() as conn:
+        species_list = [row['species'] for row in conn.execute('SELECT DISTINCT species FROM development_times')]
+
+    warmed = []
+    for species in species_list:
+        try:
+            species_interpolator(species)
+        except ValueError:
+            continue
+        warmed.append(species)
+    print(f"Warm-up: {len(warmed)} of {len(species_list)} species ready in {time.perf_counter() - start:.1f} s")
+    return warmed
+
+
+# Function to wake the background refresher
+def request_grid_refresh():
+    _refresh_event.set()
+
+
+def refresh_loop():
+    while True:
+        _refresh_event.wait()
+        _refresh_event.clear()
+        try:
+            refresh_stale_grids()
+        except Exception as e:
+            print(f"Grid refresh failed: {e}")
+
+
+# Function to start the background refresher once per process
+def start_grid_refresher():
+    """
+    Starts a daemon thread that rebuilds stale grids after every data write.
+    There is no rebuild at startup, so starting the app neither fits
+    interpolators nor loads SciPy; a grid that went stale while the app was
+    down is rebuilt once get_species_grid first meets it (warm_up rebuilds
+    every stale grid up front).
+    """
+    global _refresher, _listener_registered
+    with _refresher_lock:
+        if _refresher is not None and _refresher.is_alive():
+            return
+        if not _listener_registered:
+            add_write_listener(request_grid_refresh)
+            _listener_registered = True
+        _refresher = threading.Thread(target=refresh_loop, name='grid-refresher', daemon=True)
+        _refresher.start()
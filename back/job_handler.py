@@ -0,0 +1,154 @@
+# job_handler.py
+
+import os
+import time
+import uuid
+import queue
+import threading
+
+# Worker threads running jobs, jobs allowed to wait for a worker, and seconds a finished job is kept
+JOB_WORKERS = int(os.environ.get('MEDAKA_JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.environ.get('MEDAKA_JOB_QUEUE_SIZE', '32'))
+JOB_RESULT_TTL = float(os.environ.get('MEDAKA_JOB_RESULT_TTL', '600'))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """
+    Raised by JobQueue.submit when JOB_QUEUE_SIZE jobs are already waiting.
+    """
+
+
+class Job:
+    """
+    One submitted call: func(*args) runs on a worker thread, its return value
+    becomes the result and a ValueError its error message.
+    """
+    def __init__(self, func, args):
+        self.job_id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobQueue:
+    """
+    In-process job store with a bounded queue and a fixed pool of daemon
+    worker threads, started on the first submit. Jobs live in the memory of
+    the process that accepted them, so with several worker processes status
+    requests must reach the same process (sticky sessions or one process).
+    """
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE, ttl=JOB_RESULT_TTL):
+        self.workers = workers
+        self.ttl = ttl
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, func, *args):
+        """
+        Queues func(*args) and returns its Job. Raises JobQueueFull when the queue is full.
+        """
+        self.purge_expired()
+        self.start_workers()
+        job = Job(func, args)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        try:
+            self._pending.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.job_id]
+            raise JobQueueFull("Too many prediction jobs are waiting; try again later.")
+        return job
+
+    def get(self, job_id):
+        """
+        Returns the Job, or None when it is unknown or its result has expired.
+        """
+        self.purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancels a job. A queued job never runs; a running job finishes in the
+        background but its result is discarded. Returns the Job or None.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self.finish(job, CANCELLED)
+        return job
+
+    def finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished = time.time()
+        # Drop the references to the input as soon as the job is done
+        job.func = job.args = None
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINISHED and job.finished < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def start_workers(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self.work_loop, name=f'job-worker-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def work_loop(self):
+        while True:
+            job = self._pending.get()
+            try:
+                with self._lock:
+                    if job.status != QUEUED:
+                        continue
+                    job.status = RUNNING
+                    job.started = time.time()
+                    func, args = job.func, job.args
+                try:
+                    result, status, error = func(*args), DONE, None
+                except ValueError as e:
+                    result, status, error = None, FAILED, str(e)
+                except Exception as e:
+                    print(f"Prediction job {job.job_id} failed: {e}")
+                    result, status, error = None, FAILED, "Internal error while running the prediction."
+                with self._lock:
+                    if job.cancel_requested:
+                        self.finish(job, CANCELLED)
+                    else:
+                        self.finish(job, status, result, error)
+            finally:
+                self._pending.task_done()
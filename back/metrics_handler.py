@@ -0,0 +1,166 @@
+# metrics_handler.py
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# Add a Server-Timing header with the step durations to every response (off by default)
+SERVER_TIMING = os.environ.get('MEDAKA_SERVER_TIMING', 'off') == 'on'
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROWS_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# Steps timed during the current request, per thread
+_request = threading.local()
+# Every metric created, in creation order, for render_metrics
+_registry = []
+
+
+class Histogram:
+    """
+    Cumulative histogram with one label, rendered in the Prometheus text format.
+    Metrics are kept per process: with several worker processes each one
+    reports its own series.
+    """
+    def __init__(self, name, help_text, label, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(s['counts']), s['sum'], s['count']) for key, s in self._series.items()}
+        for label_value in sorted(series):
+            counts, total, count = series[label_value]
+            label = f'{self.label}="{escape_label(label_value)}"'
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label}}} {total}')
+            lines.append(f'{self.name}_count{{{label}}} {count}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    """
+    Monotonic counter with one label, rendered in the Prometheus text format.
+    """
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, label_value, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values)
+        for label_value in sorted(values):
+            lines.append(f'{self.name}{{{self.label}="{escape_label(label_value)}"}} {values[label_value]}')
+        return '\n'.join(lines)
+
+
+STEP_SECONDS = Histogram(
+    'medaka_pipeline_step_seconds', 'Wall time of prediction pipeline steps and database blocks.',
+    'step', SECONDS_BUCKETS
+)
+STEP_ROWS = Histogram(
+    'medaka_pipeline_step_rows', 'Rows produced by prediction pipeline steps.',
+    'step', ROWS_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'medaka_request_seconds', 'Wall time of HTTP requests by endpoint.',
+    'endpoint', SECONDS_BUCKETS
+)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Function to record one finished step
+def observe_step(name, seconds, rows=None):
+    """
+    Adds the step to the histograms and, inside a request, to the request's
+    timings used for the Server-Timing header.
+    """
+    STEP_SECONDS.observe(name, seconds)
+    if rows is not None:
+        STEP_ROWS.observe(name, rows)
+    timings = getattr(_request, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class StepTimer:
+    """
+    Handle yielded by timed_step; set .rows to record the step's row count.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+
+
+# Function to time a block of code as a named pipeline step
+@contextmanager
+def timed_step(name):
+    step = StepTimer(name)
+    start = time.perf_counter()
+    try:
+        yield step
+    finally:
+        observe_step(name, time.perf_counter() - start, step.rows)
+
+
+# Function to start collecting step timings for the request handled by this thread
+def start_request_timing():
+    _request.timings = {}
+    _request.start = time.perf_counter()
+
+
+# Function to stop collecting and record the request duration
+def finish_request_timing(endpoint):
+    """
+    Returns the Server-Timing header value for the request, or None when the
+    header is disabled or no request was being timed.
+    """
+    timings = getattr(_request, 'timings', None)
+    if timings is None:
+        return None
+    total = time.perf_counter() - _request.start
+    _request.timings = None
+    REQUEST_SECONDS.observe(endpoint or 'unknown', total)
+    if not SERVER_TIMING:
+        return None
+    entries = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items()]
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+# Function to render all metrics in the Prometheus text exposition format
+def render_metrics():
+    return '\n'.join(metric.render() for metric in _registry) + '\n'
@@ -0,0 +1,162 @@
+# parallel_handler.py
+
+import os
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+from analysis import pivot_development_times, switch_rows_from_grid, combine_switch_rows
+
+# Worker processes for switch schedule expansion: 0 (default) keeps everything in the
+# request thread, 'auto' uses one per CPU
+_workers_setting = os.environ.get('MEDAKA_PARALLEL_WORKERS', '0')
+PARALLEL_WORKERS = (os.cpu_count() or 1) if _workers_setting == 'auto' else int(_workers_setting)
+# Requests with fewer (pair x stage/switch stage) cells than this are expanded serially
+PARALLEL_MIN_CELLS = int(os.environ.get('MEDAKA_PARALLEL_MIN_CELLS', '500000'))
+# Shards per worker, so uneven shards still keep every worker busy
+SHARDS_PER_WORKER = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Function to get the shared process pool, created on first use
+def get_process_pool():
+    """
+    Workers are spawned rather than forked: the server runs background
+    threads, and forking a threaded process can deadlock the child.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+# Function to drop a pool whose worker died, so the next parallel request starts a fresh one
+def discard_process_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class SharedGrid:
+    """
+    Copies a float64 array into a shared memory block once; workers attach to
+    it by name instead of receiving a pickled copy. Use as a context manager
+    so the block is released when all shards are done.
+    """
+    def __init__(self, array):
+        array = np.ascontiguousarray(array, dtype=float)
+        self.shape = array.shape
+        self._memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(self.shape, dtype=float, buffer=self._memory.buf)[...] = array
+        self.name = self._memory.name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._memory.close()
+        self._memory.unlink()
+
+
+# Worker side: evaluate one shard of temperature pairs on the shared grid
+def switch_rows_shard(grid_name, grid_shape, temperatures, stages, temps_combinations, required_stages, pair_offset):
+    # Spawned workers share the parent's resource tracker, so only the parent unlinks the block
+    memory = shared_memory.SharedMemory(name=grid_name)
+    try:
+        grid = np.ndarray(grid_shape, dtype=float, buffer=memory.buf)
+        # The results are fresh arrays, so no view into the block outlives this call
+        return switch_rows_from_grid(temperatures, stages, grid, temps_combinations, required_stages, pair_offset)
+    finally:
+        grid = None
+        memory.close()
+
+
+# Function to count the cells the switch expansion evaluates
+def switch_cells(temps_combinations, required_stages):
+    return len(temps_combinations) * sum(max(int(stage), 0) for stage in required_stages)
+
+
+# Function to expand the switch schedules of several species at once
+def calculate_switch_times_many(tables):
+    """
+    tables is a list of (interpolated_df, temps_combinations, required_stages);
+    returns the extended DataFrames in the same order, equal to
+    analysis.calculate_switch_times on each. The pair space of every species
+    is split into contiguous shards that all run on the shared process pool,
+    so species are evaluated side by side. Without workers, or when the whole
+    batch is small, everything runs serially in the calling thread. If a
+    worker dies (OOM, kill) the broken pool is discarded and the batch is
+    expanded serially; the next parallel batch gets a new pool.
+    """
+    prepared = []
+    for df, temps_combinations, required_stages in tables:
+        df['Temperature'] = df['Temperature'].astype(float)
+        df['Stage'] = df['Stage'].astype(int)
+        # Stages missing from the grid have no schedule and must not count towards the parallel threshold
+        grid_stages = set(df['Stage'].tolist())
+        prepared.append((df, list(temps_combinations), [stage for stage in required_stages if stage in grid_stages]))
+
+    total_cells = sum(switch_cells(combinations, stages) for _, combinations, stages in prepared)
+    if PARALLEL_WORKERS > 1 and total_cells >= PARALLEL_MIN_CELLS:
+        pool = get_process_pool()
+        try:
+            return expand_switch_rows(prepared, pool)
+        except BrokenProcessPool:
+            print("Switch expansion pool broke; expanding serially and starting a new pool next time")
+            discard_process_pool(pool)
+    return expand_switch_rows(prepared, None)
+
+
+# Function to expand prepared (df, temps_combinations, required_stages) tables, on the pool if given
+def expand_switch_rows(prepared, pool):
+    grids = []
+    futures = []
+    try:
+        for df, temps_combinations, required_stages in prepared:
+            if not temps_combinations or not required_stages:
+                futures.append(None)
+                continue
+            temperatures, stages, grid = pivot_development_times(df)
+            if pool is None:
+                futures.append([switch_rows_from_grid(temperatures, stages, grid, temps_combinations, required_stages)])
+                continue
+
+            shared = SharedGrid(grid)
+            grids.append(shared)
+            shard_count = min(len(temps_combinations), PARALLEL_WORKERS * SHARDS_PER_WORKER)
+            bounds = np.linspace(0, len(temps_combinations), shard_count + 1).astype(int)
+            futures.append([
+                pool.submit(
+                    switch_rows_shard, shared.name, shared.shape, temperatures, stages,
+                    temps_combinations[start:end], required_stages, start
+                )
+                for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+            ])
+
+        extended = []
+        for (df, temps_combinations, _), shards in zip(prepared, futures):
+            if shards is None:
+                extended.append(combine_switch_rows(df, [], temps_combinations))
+            else:
+                extended.append(combine_switch_rows(
+                    df, [shard if isinstance(shard, dict) else shard.result() for shard in shards], temps_combinations
+                ))
+        return extended
+    finally:
+        for shared in grids:
+            shared.__exit__(None, None, None)
+
+
+# Function to expand the switch schedules of one species, in parallel when worthwhile
+def calculate_switch_times_parallel(df, temps_combinations, required_stages):
+    return calculate_switch_times_many([(df, temps_combinations, required_stages)])[0]
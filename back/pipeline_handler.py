@@ -0,0 +1,363 @@
+# pipeline_handler.py
+
+import numpy as np
+import pandas as pd
+from grid_handler import get_species_grid, GRID_MAX_STAGE
+from parallel_handler import calculate_switch_times_parallel
+from metrics_handler import timed_step
+from analysis import (
+    calculate_start_times,
+    calculate_end_times,
+    find_earliest_starts,
+    suggest_earliest_start,
+    filter_results_by_timing,
+    generate_temp_combinations,
+    get_interpolated_durations,
+    suggest_fastest_temperature,
+    convert_df_to_serializable,
+    add_multi_switch_schedules,
+    LazyGrid,
+)
+
+# The /predict pipeline without Flask, shared by app.py and plan_cli.py
+
+# Fit (or reuse) the species model and build the grid and switch tables shared by all scenarios
+def build_species_tables(required_species, available_temperatures, required_stages):
+    """
+    Returns (species_grid, extended_df) for one species. species_grid is the
+    species' LazyGrid; extended_df is a ScheduleTable holding the switch
+    schedules for every stage in required_stages, so it can be shared by
+    scenarios asking for any subset of those stages.
+    Raises ValueError when the species has too little data to interpolate.
+    """
+    # The switch schedules only read the stages up to the last required one
+    species_grid = get_species_grid(required_species)
+    with timed_step('grid') as step:
+        interpolated_df = species_grid.frame(available_temperatures, range(switch_max_stage(required_stages) + 1))
+        step.rows = len(interpolated_df)
+
+    with timed_step('switch_expansion') as step:
+        temp_combinations = generate_temp_combinations(available_temperatures)
+        extended_df = calculate_switch_times_parallel(interpolated_df, temp_combinations, required_stages)
+        step.rows = len(extended_df)
+
+    return species_grid, extended_df
+
+# Helper function to get the last grid stage the switch schedules of the required stages read
+def switch_max_stage(required_stages):
+    return min(max(required_stages, default=0), GRID_MAX_STAGE)
+
+# Run the timing part of the pipeline for one scenario on prebuilt tables
+def run_scenario(sanitized_data, species_grid, extended_df, temperature_colors, trace=None):
+    """
+    species_grid is the species' LazyGrid (or its interpolated DataFrame).
+    Computes start/end times, applies the lab and collection windows, picks the
+    fastest temperature per stage and returns the response fields for the
+    frontend: {'scheduleData': [...]}, plus 'searchResults' (every feasible
+    schedule at its earliest start) when search_start is set.
+    trace(name, df), if given, receives the intermediate tables.
+    Raises ValueError when no schedule matches the criteria.
+    """
+    required_stages = sanitized_data['required_stages']
+    available_temperatures = sanitized_data['available_temperatures']
+    start_datetime = sanitized_data['start_datetime']
+    desired_time = sanitized_data['desired_time']
+    collection_start = sanitized_data['collection_start']
+    collection_end = sanitized_data['collection_end']
+    lab_days = sanitized_data['lab_days']
+    lab_start_time = sanitized_data['lab_start_time']
+    lab_end_time = sanitized_data['lab_end_time']
+    lab_hours = sanitized_data['lab_hours']
+    max_switches = sanitized_data['max_switches']
+    search_start = sanitized_data['search_start']
+
+    # Schedules with several switches; with both times set, also those that fit the gap between them
+    target_hours = None
+    if start_datetime and desired_time:
+        target_hours = (desired_time - start_datetime).total_seconds() / 3600
+    with timed_step('multi_switch_planning') as step:
+        extended_df = add_multi_switch_schedules(
+            extended_df, species_grid, available_temperatures, required_stages, max_switches, target_hours
+        )
+        step.rows = len(extended_df)
+
+    if search_start:
+        return run_start_search(sanitized_data, extended_df, temperature_colors, trace=trace)
+
+    with timed_step('start_end_times') as step:
+        if desired_time:
+            results_df = calculate_start_times(extended_df, required_stages, available_temperatures, desired_time)
+        elif start_datetime:
+            results_df = calculate_end_times(extended_df, required_stages, available_temperatures, start_datetime)
+        else:
+            results_df = get_interpolated_durations(species_grid, required_stages, available_temperatures)
+        step.rows = len(results_df) if results_df is not None else 0
+
+    if results_df is None:
+        raise ValueError("No interpolated data available for the specified stages and temperatures.")
+
+    if trace:
+        trace('output01', results_df.to_frame())
+
+    if start_datetime or collection_start or lab_days or lab_start_time or lab_hours:
+        with timed_step('timing_filter') as step:
+            filtered_results_df = filter_results_by_timing(
+                results_df, lab_days, lab_start_time, lab_end_time, collection_start, collection_end, start_datetime, desired_time,
+                lab_hours=lab_hours
+            )
+            step.rows = len(filtered_results_df) if filtered_results_df is not None else 0
+    else:
+        filtered_results_df = results_df
+
+    if filtered_results_df is None or len(filtered_results_df) == 0:
+        raise ValueError("No available times match the specified criteria.")
+
+    if trace:
+        trace('output02', filtered_results_df.to_frame())
+
+    with timed_step('fastest_temperature') as step:
+        fastest_temp_df = suggest_fastest_temperature(filtered_results_df, required_stages)
+        step.rows = len(fastest_temp_df)
+
+    with timed_step('serialization') as step:
+        serializable_df = convert_df_to_serializable(fastest_temp_df)
+        schedule_data = prepare_schedule_data(
+            serializable_df,
+            temperature_colors,
+            start_datetime=start_datetime,
+            desired_time=desired_time
+        )
+        step.rows = len(schedule_data)
+
+    return {'scheduleData': schedule_data}
+
+# Search the earliest start of every schedule instead of evaluating one start or desired time
+def run_start_search(sanitized_data, extended_df, temperature_colors, trace=None):
+    """
+    Scans search_days from search_start in steps of search_step_minutes for the
+    earliest start at which collection and switch moments fall inside the lab
+    and collection windows. scheduleData holds the schedule that can start
+    first for each stage, searchResults every feasible schedule.
+    """
+    required_stages = sanitized_data['required_stages']
+
+    with timed_step('start_search') as step:
+        results_df = find_earliest_starts(
+            extended_df,
+            required_stages,
+            sanitized_data['available_temperatures'],
+            sanitized_data['search_start'],
+            search_days=sanitized_data['search_days'],
+            step_minutes=sanitized_data['search_step_minutes'],
+            lab_days=sanitized_data['lab_days'],
+            lab_start_time=sanitized_data['lab_start_time'],
+            lab_end_time=sanitized_data['lab_end_time'],
+            collection_start=sanitized_data['collection_start'],
+            collection_end=sanitized_data['collection_end'],
+            lab_hours=sanitized_data['lab_hours'],
+        )
+        step.rows = len(results_df) if results_df is not None else 0
+
+    if results_df is None:
+        raise ValueError("No start within the search range matches the specified criteria.")
+
+    if trace:
+        trace('output02', results_df.to_frame())
+
+    with timed_step('serialization') as step:
+        earliest_df = suggest_earliest_start(results_df, required_stages)
+        schedule_data = prepare_schedule_data(convert_df_to_serializable(earliest_df), temperature_colors)
+        search_results = prepare_schedule_data(convert_df_to_serializable(results_df), temperature_colors)
+        step.rows = len(search_results)
+
+    return {'scheduleData': schedule_data, 'searchResults': search_results}
+
+
+# Colors assigned to datasets in order
+GRAPH_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40']
+GRAPH_FORMATS = ('records', 'columnar')
+
+# Helper function to split a sorted DataFrame into the row ranges of consecutive equal keys
+def group_bounds(keys):
+    """
+    Returns (starts, ends) of the runs of equal rows in keys, a list of
+    equally long arrays that are already sorted.
+    """
+    length = len(keys[0])
+    if length == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    changed = np.zeros(length - 1, dtype=bool)
+    for key in keys:
+        changed |= key[1:] != key[:-1]
+    starts = np.concatenate([[0], np.flatnonzero(changed) + 1])
+    ends = np.append(starts[1:], length)
+    return starts, ends
+
+# Helper function to build the points of one dataset
+def dataset_points(x_values, y_values, x_name, y_name, graph_format):
+    """
+    'records' gives [{x_name: x, y_name: y}, ...] under 'data', 'columnar'
+    gives the parallel lists 'x' and 'y'.
+    """
+    if graph_format == 'columnar':
+        return {'x': x_values, 'y': y_values}
+    return {'data': [{x_name: x, y_name: y} for x, y in zip(x_values, y_values)]}
+
+# Helper function to process graph data for Enter Data page
+def process_graph_data(data, graph_format='records'):
+    if not data:
+        return []
+
+    # Organize data by species and temperature; the stable sort keeps the measurement order within a group
+    df = pd.DataFrame(data)
+    df['species'] = df['species'].astype(str)
+    df['temperature'] = df['temperature'].astype(float)
+    df = df.sort_values(by=['species', 'temperature'], kind='stable')
+
+    species = df['species'].to_numpy()
+    temperatures = df['temperature'].to_numpy()
+    stages = df['stage'].astype(float).tolist()
+    development_times = df['development_time_hpf'].astype(float).tolist()
+
+    graph_data = []
+    starts, ends = group_bounds([species, temperatures])
+    for color_index, (start, end) in enumerate(zip(starts, ends)):
+        dataset = {
+            'species': species[start],
+            'temperature': float(temperatures[start]),
+            **dataset_points(
+                development_times[start:end], stages[start:end], 'development_time_hpf', 'stage', graph_format
+            ),
+            'color': GRAPH_COLORS[color_index % len(GRAPH_COLORS)],
+        }
+        graph_data.append(dataset)
+
+    return graph_data
+
+# Helper function to prepare graph data for Predict Stages page
+def prepare_graph_data(interpolated_df, available_temperatures, graph_format='records'):
+    """
+    Prepare graph data with all interpolated development times for the selected species 
+    across available temperatures, without filtering by required stages.
+    interpolated_df is the interpolated DataFrame or a LazyGrid.
+    """
+    if isinstance(interpolated_df, LazyGrid):
+        interpolated_df = interpolated_df.frame(available_temperatures)
+
+    # Filter the interpolated dataframe by available temperatures
+    graph_df = interpolated_df[interpolated_df['Temperature'].isin(available_temperatures)]
+
+    # Sort the dataframe by stage and development time to get cleaner plots
+    graph_df = graph_df.sort_values(by=['Stage', 'Development_Time'])
+
+    # Temperatures in order of first appearance, then one stable sort to make each temperature contiguous
+    temperatures = graph_df['Temperature'].unique()
+    codes = pd.Index(temperatures).get_indexer(graph_df['Temperature'])
+    order = np.argsort(codes, kind='stable')
+    development_times = graph_df['Development_Time'].to_numpy()[order].tolist()
+    stages = graph_df['Stage'].to_numpy()[order].tolist()
+    counts = np.bincount(codes, minlength=len(temperatures))
+    ends = np.cumsum(counts)
+    starts = ends - counts
+
+    # Initialize graph data structure
+    graph_data = {
+        'datasets': [],
+        'temperature_colors': {}  # to store temperature to color mapping
+    }
+
+    for i, (temp, start, end) in enumerate(zip(temperatures, starts, ends)):
+        color = GRAPH_COLORS[i % len(GRAPH_COLORS)]
+        graph_data['temperature_colors'][temp] = color  # Store the color mapping
+
+        dataset = {
+            'temperature': temp,
+            **dataset_points(
+                development_times[start:end], stages[start:end], 'Development_Time', 'Stage', graph_format
+            ),
+            'color': color,
+        }
+
+        graph_data['datasets'].append(dataset)
+
+    return graph_data
+
+# Helper function to get the colors prepare_graph_data gives the temperatures, without the rest of the graph
+def temperature_colors(species_grid, available_temperatures):
+    """
+    Colors follow the order of the temperatures at the first stage, so only
+    stage 0 of the grid is read.
+    """
+    return prepare_graph_data(species_grid.frame(available_temperatures, [0]), available_temperatures)['temperature_colors']
+
+# Helper function to read a column as Python values, None where it is missing or null
+def column_values(df, name):
+    if name not in df.columns:
+        return [None] * len(df)
+    values = df[name]
+    return [None if null else value for value, null in zip(values.tolist(), values.isna().tolist())]
+
+# Helper function to prepare schedule data for Predict Stages page
+def prepare_schedule_data(df, temperature_colors, start_datetime=None, desired_time=None):
+    if df is None or df.empty:
+        return []
+
+    # Single-temperature rows have no Temp1 and fall back to Temperature
+    temps1 = [
+        temp1 if temp1 is not None else temperature
+        for temp1, temperature in zip(column_values(df, 'Temp1'), column_values(df, 'Temperature'))
+    ]
+    temps2 = column_values(df, 'Temp2')
+
+    development_times = df['Development_Time'].to_numpy(dtype=float)
+    duration_percentages = (development_times / development_times.max()) * 100
+
+    # Switch percentages only for rows with an exact switch time
+    switch_times = column_values(df, 'Exact_Switch_Time')
+    has_switch = np.array([value is not None for value in switch_times], dtype=bool)
+    switch_percentages = [None] * len(df)
+    after_switch_percentages = [None] * len(df)
+    if has_switch.any():
+        switch_durations = df['Switch_Times'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentages = (switch_durations / development_times) * 100
+        # Only zero-length schedules are skipped (no division by zero); negative durations keep their split
+        for i in np.flatnonzero(has_switch & (development_times != 0)):
+            switch_percentages[i] = float(percentages[i])
+            after_switch_percentages[i] = 100 - float(percentages[i])
+
+    columns = zip(
+        df['Stage'].tolist(),
+        column_values(df, 'Start_Time'),
+        column_values(df, 'End_Time'),
+        temps1,
+        temps2,
+        df['Development_Time'].tolist(),
+        duration_percentages.tolist(),
+        switch_times,
+        switch_percentages,
+        after_switch_percentages,
+    )
+    segments = df['Segments'].tolist() if 'Segments' in df.columns else None
+
+    schedule_data = []
+    for i, (stage, start_time, end_time, temp1, temp2, duration, duration_percentage,
+            switch_time, switch_percentage, after_switch_percentage) in enumerate(columns):
+        item = {
+            'stage': stage,
+            'startTime': start_time,
+            'endTime': end_time,
+            'temperature': temp1,
+            'temperature2': temp2,
+            'duration': duration,
+            'durationPercentage': duration_percentage,
+            'color': temperature_colors.get(temp1),
+            'color2': temperature_colors.get(temp2) if temp2 else None,
+            'switchTime': switch_time,
+            'switchDurationPercentage': switch_percentage,
+            'afterSwitchDurationPercentage': after_switch_percentage,
+        }
+        if segments is not None:
+            item['segments'] = segments[i] if isinstance(segments[i], list) else None
+        schedule_data.append(item)
+    return schedule_data
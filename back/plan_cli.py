@@ -0,0 +1,164 @@
+# plan_cli.py
+#
+# Runs the /predict pipeline for many scenarios without Flask or a running server.
+# Scenarios are read from a JSONL file (one /predict request object per line) or a
+# CSV file (one column per /predict field; list and object cells written as JSON,
+# e.g. "[20, 30]"). One JSON result line is written per scenario as soon as it is
+# planned; scenarios of the same species and temperatures share the fitted
+# interpolator and the switch tables.
+#
+# Usage:
+#   python plan_cli.py scenarios.jsonl --output results.jsonl
+#   python plan_cli.py tanks.csv --db medaka_development.db --graph
+
+import sys
+import csv
+import json
+import time
+import argparse
+from collections import OrderedDict
+from contextlib import redirect_stdout
+
+# Species tables kept for reuse by later scenarios
+TABLE_CACHE_SIZE = 8
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Plan many /predict scenarios from a file, one result line each.")
+    parser.add_argument('scenarios', help="JSONL or CSV file with one scenario per line/row ('-' reads JSONL from stdin)")
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help="input format (default: from the file extension)")
+    parser.add_argument('--output', default='-', help="where to write the JSONL results (default: stdout)")
+    parser.add_argument('--db', help="SQLite database to read (default: MEDAKA_DB_PATH or the bundled database)")
+    parser.add_argument('--graph', action='store_true', help="include the graphData of each scenario")
+    return parser.parse_args(argv)
+
+
+# Function to read a CSV cell: JSON where it parses (numbers, lists, objects), text otherwise
+def parse_csv_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+# Function to read the scenarios of a JSONL or CSV file
+def read_scenarios(file, file_format):
+    """
+    Yields (line_number, scenario, error): scenario is the request dict, or
+    None with error set when the line cannot be parsed. Blank lines and empty
+    CSV cells are skipped.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            scenario = {key.strip(): parse_csv_value(value) for key, value in row.items()
+                        if key and value is not None and value.strip()}
+            yield reader.line_num, scenario, None
+        return
+
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            scenario = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(scenario, dict):
+            yield line_number, None, "Each scenario should be an object."
+            continue
+        yield line_number, scenario, None
+
+
+# Function to plan one validated scenario, reusing the tables of earlier scenarios
+def plan_scenario(sanitized_data, tables, include_graph):
+    from pipeline_handler import build_species_tables, prepare_graph_data, temperature_colors, run_scenario
+
+    key = (
+        sanitized_data['required_species'],
+        tuple(sorted(float(t) for t in sanitized_data['available_temperatures'])),
+        tuple(sanitized_data['required_stages']),
+        # The cached graph is built in the scenario's graph format
+        sanitized_data['graph_format'] if include_graph else None,
+    )
+    cached = tables.get(key)
+    if cached is None:
+        species_grid, extended_df = build_species_tables(
+            sanitized_data['required_species'],
+            sanitized_data['available_temperatures'],
+            sanitized_data['required_stages'],
+        )
+        # Without --graph only the colors are needed, which read a single stage of the grid
+        if include_graph:
+            graph_data = prepare_graph_data(
+                species_grid, sanitized_data['available_temperatures'], sanitized_data['graph_format']
+            )
+        else:
+            graph_data = {'temperature_colors': temperature_colors(species_grid, sanitized_data['available_temperatures'])}
+        cached = (species_grid, extended_df, graph_data)
+        tables[key] = cached
+        while len(tables) > TABLE_CACHE_SIZE:
+            tables.popitem(last=False)
+    else:
+        tables.move_to_end(key)
+
+    species_grid, extended_df, graph_data = cached
+    result = run_scenario(
+        sanitized_data, species_grid, extended_df, graph_data.get('temperature_colors', {})
+    )
+    if include_graph:
+        result = {'graphData': graph_data, **result}
+    return result
+
+
+def main(argv):
+    args = parse_args(argv)
+    file_format = args.format or ('csv' if args.scenarios.lower().endswith('.csv') else 'jsonl')
+
+    from db_handler import configure_database, migrate_database
+    from user_handler import handle_and_validate_user_input
+
+    if args.db:
+        configure_database(args.db)
+    migrate_database()
+
+    input_file = sys.stdin if args.scenarios == '-' else open(args.scenarios, newline='', encoding='utf-8')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    tables = OrderedDict()
+    planned = failed = 0
+    start = time.perf_counter()
+    # The pipeline prints progress messages; keep them out of the result stream
+    with redirect_stdout(sys.stderr):
+        try:
+            for line_number, scenario, error in read_scenarios(input_file, file_format):
+                line = {'line': line_number}
+                if scenario is not None:
+                    line['id'] = scenario.get('id')
+                    line['species'] = scenario.get('required_species')
+                    try:
+                        sanitized_data = handle_and_validate_user_input(scenario)
+                        if not sanitized_data['required_species']:
+                            raise ValueError("No species provided or species not found")
+                        line.update(plan_scenario(sanitized_data, tables, args.graph))
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    line['error'] = error
+                    failed += 1
+                else:
+                    planned += 1
+                output.write(json.dumps(line) + '\n')
+                output.flush()
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+            if args.output != '-':
+                output.close()
+
+    print(f"Planned {planned} of {planned + failed} scenarios in {time.perf_counter() - start:.1f} s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
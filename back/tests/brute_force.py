@@ -0,0 +1,52 @@
+# brute_force.py
+#
+# Slow, obviously correct window checks shared by the timing tests.
+
+from datetime import time, timedelta
+
+import pandas as pd
+
+
+# Function to check one moment against (weekday, start, end) windows the slow way
+def inside(moment, windows):
+    for weekday, start, end in windows:
+        if end is None:
+            if moment.weekday() == weekday:
+                return True
+            continue
+        start, end = time.fromisoformat(start), time.fromisoformat(end)
+        if end >= start:
+            if moment.weekday() == weekday and start <= moment.time() <= end:
+                return True
+        elif (moment.weekday() == weekday and moment.time() >= start) or \
+                (moment.weekday() == (weekday + 1) % 7 and moment.time() <= end):
+            return True
+    return False
+
+
+# Function to spell out the lab windows the way lab_windows reads its arguments
+def lab_window_list(lab_days=None, lab_start_time=None, lab_end_time=None, lab_hours=None, **_):
+    if lab_hours:
+        return [(weekday, start, end) for weekday, ranges in lab_hours.items() for start, end in ranges]
+    if not lab_days and not (lab_start_time and lab_end_time):
+        return None
+    days = lab_days or range(7)
+    if lab_start_time and lab_end_time:
+        return [(day, lab_start_time, lab_end_time) for day in days]
+    return [(day, '00:00', None) for day in days]
+
+
+# Function to check every lab and collection moment of one schedule row, moved by shift
+def row_fits(row, lab, collection, moment_column='End_Time', shift=timedelta(0)):
+    moment = row[moment_column] + shift
+    if collection is not None and not inside(moment, collection):
+        return False
+    if lab is None:
+        return True
+    moments = [moment]
+    if not pd.isna(row['Exact_Switch_Time']):
+        moments.append(row['Exact_Switch_Time'] + shift)
+    segments = row.get('Segments')
+    for segment in (segments if isinstance(segments, list) else [])[2:]:
+        moments.append(row['Start_Time'] + shift + timedelta(hours=segment['Start_Hours']))
+    return all(inside(moment, lab) for moment in moments)
@@ -0,0 +1,67 @@
+# conftest.py
+#
+# The backend modules live flat in back/; make them importable from the tests.
+
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACK_DIR)
+
+BUNDLED_DB = os.path.join(BACK_DIR, 'medaka_development.db')
+
+
+# Function to build an interpolated DataFrame with random, increasing development times
+def make_interpolated_df(temperatures, max_stage, seed=0, min_step=2.0, max_step=20.0):
+    """
+    Same layout as create_interpolated_dataset: one row per (temperature,
+    stage 0..max_stage), development times in hours.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for temperature in temperatures:
+        times = np.cumsum(rng.uniform(min_step, max_step, max_stage + 1))
+        for stage, development_time in enumerate(times):
+            rows.append((float(temperature), stage, float(development_time)))
+    df = pd.DataFrame(rows, columns=['Temperature', 'Stage', 'Development_Time'])
+    df['Switch'] = False
+    return df
+
+
+@pytest.fixture
+def interpolated_df():
+    return make_interpolated_df
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Points db_handler at a fresh copy of the bundled database. It is not
+    pointed back afterwards: the grid refresher may still be reading the copy.
+    """
+    import db_handler
+    path = str(tmp_path / 'medaka_development.db')
+    shutil.copyfile(BUNDLED_DB, path)
+    db_handler.configure_database(path)
+    db_handler.migrate_database()
+    return path
+
+
+@pytest.fixture
+def client(database):
+    # Imported after the database is configured, since importing app migrates it
+    import app
+    with app._read_payloads_lock:
+        app._read_payloads.clear()
+    return app.app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post('/login', json={'username': 'medaka', 'password': 'eyehigh!'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
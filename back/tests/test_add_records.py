@@ -0,0 +1,50 @@
+# test_add_records.py
+#
+# Batch inserts are all or nothing, through add_records and /enter-data.
+
+import pytest
+
+from db_handler import add_records, get_db_connection
+
+VALID = ('Oryzias latipes', 26, 10, 55.5)
+
+
+def row_count():
+    with get_db_connection() as conn:
+        return conn.execute('SELECT COUNT(*) AS n FROM development_times').fetchone()['n']
+
+
+def test_valid_batch_is_inserted(database):
+    before = row_count()
+    assert add_records([VALID, ('Oryzias latipes', '28', '12', '60')]) == 2
+    assert row_count() == before + 2
+
+
+@pytest.mark.parametrize('invalid', [
+    ('Oryzias latipes', 'warm', 10, 55.5),
+    ('Oryzias latipes', 26, 10.5, 55.5),
+    ('Oryzias latipes', 26, 10, -1),
+    ('', 26, 10, 55.5),
+])
+def test_invalid_row_writes_nothing(database, invalid):
+    before = row_count()
+    with pytest.raises(ValueError, match='^Row 2: '):
+        add_records([VALID, VALID, invalid, VALID])
+    assert row_count() == before
+
+
+def test_enter_data_rejects_the_whole_batch(client, auth_headers):
+    before = row_count()
+    rows = [
+        {'species': 'Oryzias latipes', 'temperature': '26', 'stage': '10', 'developmentTime': '55.5'},
+        {'species': 'Oryzias latipes', 'temperature': '26', 'stage': 'ten', 'developmentTime': '55.5'},
+    ]
+
+    response = client.post('/enter-data', json={'rows': rows}, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Row 1: ')
+    assert row_count() == before
+
+    response = client.post('/enter-data', json={'rows': rows[:1]}, headers=auth_headers)
+    assert response.status_code == 200
+    assert row_count() == before + 1
@@ -0,0 +1,105 @@
+# test_earliest_starts.py
+#
+# find_earliest_starts against trying every candidate start row by row.
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from analysis import (
+    calculate_switch_times,
+    calculate_end_times,
+    generate_temp_combinations,
+    add_multi_switch_schedules,
+    find_earliest_starts,
+)
+from brute_force import lab_window_list, row_fits
+from user_handler import handle_and_validate_user_input, MAX_SEARCH_STARTS
+
+TEMPERATURES = [24.0, 26.0, 28.0]
+STAGES = [3, 7, 12]
+SEARCH_START = datetime(2024, 9, 17, 10, 7)
+
+WINDOWS = {
+    'weekdays': dict(lab_days=[0, 1, 2, 3, 4], lab_start_time='08:00', lab_end_time='18:00'),
+    'overnight lab': dict(lab_start_time='22:00', lab_end_time='02:00', collection_start='23:00', collection_end='01:00'),
+    'lab hours': dict(lab_hours={2: [('09:00', '10:00'), ('15:00', '16:30')], 6: [('20:00', '03:00')]}),
+}
+
+
+def schedule_key(row):
+    return repr((row['Stage'], row['Temperature'], row['Temp1'], row['Temp2'], row['Switch_Stage'],
+                 row['Development_Time'], row.get('Segments')))
+
+
+# Function to find every schedule's earliest start by trying the candidates in order
+def brute_force_earliest(extended, window, search_days, step_minutes):
+    lab = lab_window_list(**window)
+    collection = None
+    if window.get('collection_start'):
+        collection = [(day, window['collection_start'], window['collection_end']) for day in range(7)]
+
+    frame = calculate_end_times(extended, STAGES, TEMPERATURES, SEARCH_START).to_frame()
+    earliest = Counter()
+    for row in frame.to_dict('records'):
+        for k in range(search_days * 24 * 60 // step_minutes):
+            shift = timedelta(minutes=k * step_minutes)
+            if row_fits(row, lab, collection, shift=shift):
+                earliest[(schedule_key(row), row['Start_Time'] + shift)] += 1
+                break
+    return earliest
+
+
+def search(extended, window, search_days, step_minutes, **kwargs):
+    return find_earliest_starts(
+        extended, STAGES, TEMPERATURES, SEARCH_START, search_days=search_days, step_minutes=step_minutes,
+        lab_days=window.get('lab_days'), lab_start_time=window.get('lab_start_time'),
+        lab_end_time=window.get('lab_end_time'), collection_start=window.get('collection_start'),
+        collection_end=window.get('collection_end'), lab_hours=window.get('lab_hours'), **kwargs
+    )
+
+
+@pytest.fixture
+def extended_table(interpolated_df):
+    df = interpolated_df(TEMPERATURES, max(STAGES), seed=5)
+    extended = calculate_switch_times(df, generate_temp_combinations(TEMPERATURES), STAGES)
+    return add_multi_switch_schedules(extended, df, TEMPERATURES, STAGES, max_switches=3)
+
+
+@pytest.mark.parametrize('window', WINDOWS.values(), ids=WINDOWS.keys())
+@pytest.mark.parametrize('chunk_cells', [2**20, 500], ids=['one chunk', 'small chunks'])
+def test_earliest_starts_match_brute_force(extended_table, window, chunk_cells):
+    results = search(extended_table, window, 3, 45, chunk_cells=chunk_cells)
+    expected = brute_force_earliest(extended_table, window, 3, 45)
+
+    assert expected
+    found = Counter((schedule_key(row), row['Start_Time']) for row in results.to_frame().to_dict('records'))
+    assert found == expected
+
+
+def test_large_search_range_is_chunked_by_cells(extended_table):
+    # 8640 starts with a budget below one row's worth of starts: every chunk is a single row
+    window = WINDOWS['lab hours']
+    chunked = search(extended_table, window, 60, 10, chunk_cells=1000)
+    whole = search(extended_table, window, 60, 10)
+
+    assert chunked is not None and len(chunked) > 0
+    for name in ('stage', 'development_time', 'start_ns', 'end_ns', 'switch_ns'):
+        assert np.array_equal(getattr(chunked, name), getattr(whole, name))
+
+
+def test_search_range_is_capped():
+    request = {'required_species': 'Oryzias latipes', 'required_stages': [10], 'available_temperatures': [26],
+               'search_start': '2024-09-17 10:00'}
+
+    with pytest.raises(ValueError):
+        handle_and_validate_user_input({**request, 'search_days': 60, 'search_step_minutes': 1})
+
+    allowed = handle_and_validate_user_input({**request, 'search_days': 60, 'search_step_minutes': 10})
+    assert allowed['search_days'] * 24 * 60 // allowed['search_step_minutes'] == MAX_SEARCH_STARTS
+
+    # Without a search the range fields are not used, so they are not capped
+    del request['search_start']
+    handle_and_validate_user_input({**request, 'search_days': 60, 'search_step_minutes': 1})
@@ -0,0 +1,44 @@
+# test_parallel.py
+#
+# Parallel switch expansion: equal to the serial one, and it survives a dead worker.
+
+import os
+
+import pytest
+
+import parallel_handler
+from analysis import calculate_switch_times, generate_temp_combinations
+
+TEMPERATURES = [22.0, 24.0, 26.0, 28.0]
+STAGES = [5, 10, 15]
+
+
+@pytest.fixture
+def parallel_pool(monkeypatch):
+    monkeypatch.setattr(parallel_handler, 'PARALLEL_WORKERS', 2)
+    monkeypatch.setattr(parallel_handler, 'PARALLEL_MIN_CELLS', 0)
+    yield
+    if parallel_handler._pool is not None:
+        parallel_handler.discard_process_pool(parallel_handler._pool)
+
+
+def test_broken_pool_falls_back_to_serial_and_is_replaced(interpolated_df, parallel_pool):
+    df = interpolated_df(TEMPERATURES, max(STAGES))
+    combinations = generate_temp_combinations(TEMPERATURES)
+    expected = calculate_switch_times(df.copy(), combinations, STAGES).to_frame()
+
+    parallel = parallel_handler.calculate_switch_times_parallel(df.copy(), combinations, STAGES)
+    assert parallel.to_frame().equals(expected)
+
+    # A worker that dies breaks the whole pool
+    broken = parallel_handler.get_process_pool()
+    with pytest.raises(Exception):
+        broken.submit(os._exit, 1).result()
+
+    recovered = parallel_handler.calculate_switch_times_parallel(df.copy(), combinations, STAGES)
+    assert recovered.to_frame().equals(expected)
+    assert parallel_handler._pool is None
+
+    again = parallel_handler.calculate_switch_times_parallel(df.copy(), combinations, STAGES)
+    assert again.to_frame().equals(expected)
+    assert parallel_handler._pool is not None and parallel_handler._pool is not broken
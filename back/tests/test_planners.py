@@ -0,0 +1,116 @@
+# test_planners.py
+#
+# The multi-switch planners against a brute-force enumeration of every schedule.
+
+import itertools
+
+import numpy as np
+import pytest
+
+from analysis import plan_fastest_schedules, plan_target_schedules
+
+# 22-25-28 can switch among each other, 33 only with 28
+TEMPERATURES = [22.0, 25.0, 28.0, 33.0]
+MAX_STAGE = 6
+RESOLUTION = 5 / 60
+
+
+# Function to list every schedule with exactly `switches` switches up to `stage`
+def all_schedules(stage, switches, max_diff=5):
+    """
+    Yields (temperature indices, switch stages): one switch at most per
+    stage, each to a different temperature at most max_diff away.
+    """
+    for switch_stages in itertools.combinations(range(stage), switches):
+        for sequence in itertools.product(range(len(TEMPERATURES)), repeat=switches + 1):
+            if all(a != b and abs(TEMPERATURES[a] - TEMPERATURES[b]) <= max_diff
+                   for a, b in zip(sequence, sequence[1:])):
+                yield sequence, switch_stages
+
+
+# Function to sum a schedule's segments on a [temperature, stage] array
+def schedule_total(grid, stage, sequence, switch_stages):
+    bounds = [0, *switch_stages, stage]
+    total = grid[sequence[0], bounds[1]]
+    for i, temp_index in enumerate(sequence[1:], start=1):
+        total += grid[temp_index, bounds[i + 1]] - grid[temp_index, bounds[i]]
+    return total
+
+
+def to_grid(df):
+    return df.sort_values(['Temperature', 'Stage'])['Development_Time'].to_numpy().reshape(len(TEMPERATURES), -1)
+
+
+# Function to read a planned row back as (temperature indices, switch stages)
+def row_schedule(row):
+    sequence = tuple(TEMPERATURES.index(segment['Temperature']) for segment in row['Segments'])
+    switch_stages = tuple(segment['From_Stage'] for segment in row['Segments'][1:])
+    return sequence, switch_stages
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_fastest_schedules_match_brute_force(interpolated_df, seed):
+    df = interpolated_df(TEMPERATURES, MAX_STAGE, seed=seed)
+    grid = to_grid(df)
+    stages = [2, 4, MAX_STAGE]
+
+    planned = plan_fastest_schedules(df, TEMPERATURES, stages, max_switches=3)
+    found = {(row['Stage'], row['Temperature'], row['Switch_Count']): row for row in planned.to_dict('records')}
+
+    for stage in stages:
+        for switches in range(4):
+            for start_index, start in enumerate(TEMPERATURES):
+                totals = [schedule_total(grid, stage, sequence, switch_stages)
+                          for sequence, switch_stages in all_schedules(stage, switches)
+                          if sequence[0] == start_index]
+                row = found.get((stage, start, switches))
+                if not totals:
+                    assert row is None
+                    continue
+                assert row['Development_Time'] == pytest.approx(min(totals))
+                sequence, switch_stages = row_schedule(row)
+                assert len(switch_stages) == switches
+                assert schedule_total(grid, stage, sequence, switch_stages) == pytest.approx(row['Development_Time'])
+
+
+@pytest.mark.parametrize('target_hours', [0.5, 1, 3, 40, 90, 4380])
+def test_target_schedules_match_brute_force(interpolated_df, target_hours):
+    df = interpolated_df(TEMPERATURES, MAX_STAGE, seed=3)
+    grid = to_grid(df)
+    buckets = np.rint(grid / RESOLUTION).astype(int)
+    target_bucket = int(round(target_hours / RESOLUTION))
+    stages = [1, 3, MAX_STAGE]
+
+    planned = plan_target_schedules(df, TEMPERATURES, stages, target_hours, max_switches=3)
+    found = {(row['Stage'], row['Switch_Count']): row for row in planned.to_dict('records')}
+
+    for stage in stages:
+        for switches in range(4):
+            # Durations above twice the target are out of range
+            distances = [abs(bucket - target_bucket)
+                         for bucket in (schedule_total(buckets, stage, *schedule)
+                                        for schedule in all_schedules(stage, switches))
+                         if bucket <= 2 * target_bucket]
+            row = found.get((stage, switches))
+            if not distances:
+                assert row is None
+                continue
+            sequence, switch_stages = row_schedule(row)
+            bucket = schedule_total(buckets, stage, sequence, switch_stages)
+            assert abs(bucket - target_bucket) == min(distances)
+            assert schedule_total(grid, stage, sequence, switch_stages) == pytest.approx(row['Development_Time'])
+
+
+def test_stages_outside_the_grid_are_skipped(interpolated_df):
+    df = interpolated_df(TEMPERATURES, MAX_STAGE)
+
+    for stages in ([-1], [MAX_STAGE + 1], [8000]):
+        assert plan_fastest_schedules(df, TEMPERATURES, stages, max_switches=3).empty
+        assert plan_target_schedules(df, TEMPERATURES, stages, 20, max_switches=3).empty
+
+    with_outside = plan_fastest_schedules(df, TEMPERATURES, [-1, 4, 8000], max_switches=2)
+    without = plan_fastest_schedules(df, TEMPERATURES, [4], max_switches=2)
+    assert with_outside.equals(without)
+    with_outside = plan_target_schedules(df, TEMPERATURES, [-1, 4, 8000], 40, max_switches=2)
+    without = plan_target_schedules(df, TEMPERATURES, [4], 40, max_switches=2)
+    assert with_outside.equals(without)
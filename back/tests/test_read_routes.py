@@ -0,0 +1,105 @@
+# test_read_routes.py
+#
+# The read-only routes: ETags tied to the table version, and /get-entries pages and streams.
+
+import json
+
+import pytest
+
+READ_ROUTES = ['/get-species', '/get-graph-data', '/get-graph-data?format=columnar', '/get-entries']
+
+
+def enter_row(client, auth_headers, species='ETag test species'):
+    row = {'species': species, 'temperature': '26', 'stage': '10', 'developmentTime': '55.5'}
+    response = client.post('/enter-data', json={'rows': [row]}, headers=auth_headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('route', READ_ROUTES)
+def test_unchanged_data_answers_304(client, auth_headers, route):
+    first = client.get(route, headers=auth_headers)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.get_json()
+
+    cached = client.get(route, headers={**auth_headers, 'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert cached.get_data() == b''
+
+    again = client.get(route, headers={**auth_headers, 'If-None-Match': '"stale"'})
+    assert again.status_code == 200
+    assert again.get_data() == first.get_data()
+
+
+@pytest.mark.parametrize('route', READ_ROUTES)
+def test_etag_changes_after_a_write(client, auth_headers, route):
+    first = client.get(route, headers=auth_headers)
+    etag = first.headers['ETag']
+
+    enter_row(client, auth_headers)
+
+    fresh = client.get(route, headers={**auth_headers, 'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+    assert fresh.get_data() != first.get_data()
+    assert 'ETag test species' in fresh.get_data(as_text=True)
+
+    cached = client.get(route, headers={**auth_headers, 'If-None-Match': fresh.headers['ETag']})
+    assert cached.status_code == 304
+
+
+# Function to walk /get-entries page by page
+def walk_pages(client, auth_headers, limit, **filters):
+    entries, after_id = [], None
+    while True:
+        params = {'limit': limit, **filters}
+        if after_id is not None:
+            params['after_id'] = after_id
+        response = client.get('/get-entries', query_string=params, headers=auth_headers)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page['entries']) <= limit
+        entries.extend(page['entries'])
+        after_id = page['next_after_id']
+        if after_id is None:
+            return entries
+
+
+@pytest.mark.parametrize('limit', [1, 7, 1000])
+def test_pages_return_every_entry_once(client, auth_headers, limit):
+    everything = client.get('/get-entries', headers=auth_headers).get_json()
+    paged = walk_pages(client, auth_headers, limit)
+
+    assert [entry['id'] for entry in paged] == sorted(entry['id'] for entry in everything)
+    assert sorted(paged, key=lambda entry: entry['id']) == sorted(everything, key=lambda entry: entry['id'])
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'species': 'Oryzias latipes'},
+    {'temperature': '26'},
+    {'species': 'Oryzias latipes', 'temperature': '26.0'},
+    {'species': 'No such species'},
+])
+def test_ndjson_matches_the_pages(client, auth_headers, filters):
+    paged = walk_pages(client, auth_headers, 5, **filters)
+
+    response = client.get('/get-entries', query_string={'format': 'ndjson', **filters}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    streamed = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert streamed == paged
+    assert all(entry['species'] == filters['species'] for entry in paged if 'species' in filters)
+    assert all(entry['temperature'] == 26 for entry in paged if 'temperature' in filters)
+
+    # after_id resumes the stream after that entry
+    if len(paged) > 3:
+        resumed = client.get('/get-entries', query_string={'format': 'ndjson', 'after_id': paged[2]['id'], **filters},
+                             headers=auth_headers)
+        assert [json.loads(line) for line in resumed.get_data(as_text=True).splitlines()] == paged[3:]
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=1001', 'after_id=x', 'temperature=warm'])
+def test_invalid_page_parameters(client, auth_headers, query):
+    assert client.get(f'/get-entries?{query}', headers=auth_headers).status_code == 400
@@ -0,0 +1,94 @@
+# test_schedule_table.py
+#
+# ScheduleTable against the DataFrame layout it replaces.
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import (
+    ScheduleTable,
+    NO_CODE,
+    calculate_switch_times,
+    calculate_end_times,
+    generate_temp_combinations,
+    add_multi_switch_schedules,
+)
+
+TEMPERATURES = [24.0, 26.0, 28.0]
+STAGES = [3, 7, 12]
+START = datetime(2024, 9, 17, 10, 7)
+
+
+# Function to build a switch table, with multi-switch schedules and moments if asked
+def schedule_table(interpolated_df, temperatures, seed=0, multi_switch=False, moments=False):
+    df = interpolated_df(temperatures, max(STAGES), seed=seed)
+    table = calculate_switch_times(df, generate_temp_combinations(temperatures), STAGES)
+    if multi_switch:
+        table = add_multi_switch_schedules(table, df, temperatures, STAGES, max_switches=3)
+    if moments:
+        table = calculate_end_times(table, STAGES, temperatures, START)
+    return table
+
+
+@pytest.mark.parametrize('multi_switch', [False, True], ids=['one switch', 'multi-switch'])
+@pytest.mark.parametrize('moments', [False, True], ids=['no moments', 'end times'])
+def test_frame_round_trip(interpolated_df, multi_switch, moments):
+    table = schedule_table(interpolated_df, TEMPERATURES, multi_switch=multi_switch, moments=moments)
+    frame = table.to_frame()
+    assert frame['Switch'].any() and not frame['Switch'].all()
+
+    again = ScheduleTable.from_frame(frame)
+    assert np.array_equal(again.temperatures, table.temperatures)
+    for name in ('temperature', 'temp1', 'temp2', 'stage', 'switch_stage'):
+        assert getattr(again, name).dtype == np.int16
+        assert np.array_equal(getattr(again, name), getattr(table, name))
+    pd.testing.assert_frame_equal(again.to_frame(), frame)
+
+
+def test_concat_recodes_temperatures(interpolated_df):
+    low = schedule_table(interpolated_df, [24.0, 28.0], seed=1, multi_switch=True, moments=True)
+    high = schedule_table(interpolated_df, [26.0, 30.0, 33.0], seed=2, multi_switch=True, moments=True)
+
+    combined = ScheduleTable.concat([low, high])
+    assert combined.temperatures.tolist() == [24.0, 26.0, 28.0, 30.0, 33.0]
+    for name in ('temperature', 'temp1', 'temp2'):
+        codes = getattr(combined, name)
+        assert codes.dtype == np.int16
+        missing = np.concatenate([getattr(low, name), getattr(high, name)]) == NO_CODE
+        assert np.array_equal(codes == NO_CODE, missing)
+        assert np.array_equal(combined.temperature_values(codes),
+                              np.concatenate([low.temperature_values(getattr(low, name)),
+                                              high.temperature_values(getattr(high, name))]),
+                              equal_nan=True)
+
+    expected = pd.concat([low.to_frame(), high.to_frame()], ignore_index=True)
+    pd.testing.assert_frame_equal(combined.to_frame(), expected)
+
+
+def test_concat_fills_columns_missing_from_a_table(interpolated_df):
+    with_moments = schedule_table(interpolated_df, TEMPERATURES, moments=True)
+    multi_switch = schedule_table(interpolated_df, [25.0, 27.0], multi_switch=True)
+
+    combined = ScheduleTable.concat([with_moments, multi_switch])
+    assert combined.start_ns is None
+    assert combined.segments[:len(with_moments)].tolist() == [None] * len(with_moments)
+    assert 'Start_Time' not in combined.to_frame().columns
+    assert len(combined) == len(with_moments) + len(multi_switch)
+
+
+def test_from_columns_codes_missing_values():
+    table = ScheduleTable.from_columns(
+        [False, True, True], [3, 7, 12], [26.0, np.nan, np.nan], temp1=[np.nan, 24.0, 28.0],
+        temp2=[np.nan, 28.0, 24.0], switch_stage=[np.nan, 2, 5], development_time=[10.0, 20.0, 30.0],
+    )
+    assert table.temperatures.tolist() == [24.0, 26.0, 28.0]
+    assert table.temperature.tolist() == [1, NO_CODE, NO_CODE]
+    assert table.temp1.tolist() == [NO_CODE, 0, 2]
+    assert table.switch_stage.tolist() == [NO_CODE, 2, 5]
+
+    frame = table.to_frame()
+    assert frame['Temperature'].isna().tolist() == [False, True, True]
+    assert frame['Switch_Stage'].isna().tolist() == [True, False, False]
@@ -0,0 +1,89 @@
+# test_timing_filter.py
+#
+# filter_results_by_timing against a per-row check with datetime objects.
+
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from analysis import (
+    calculate_switch_times,
+    calculate_start_times,
+    calculate_end_times,
+    generate_temp_combinations,
+    add_multi_switch_schedules,
+    filter_results_by_timing,
+)
+from brute_force import lab_window_list, row_fits
+
+TEMPERATURES = [24.0, 26.0, 28.0]
+STAGES = [3, 7, 12]
+START = datetime(2024, 9, 17, 10, 7)
+DESIRED = datetime(2024, 10, 2, 9, 0)
+
+WINDOWS = {
+    'weekdays': dict(lab_days=[0, 1, 2, 3, 4], lab_start_time='08:00', lab_end_time='18:00'),
+    'overnight lab': dict(lab_start_time='22:00', lab_end_time='02:00'),
+    'whole days': dict(lab_days=[1, 3, 5]),
+    'lab hours': dict(
+        lab_hours={0: [('08:00', '12:00'), ('13:00', '17:00')], 3: [('00:00', '23:59')], 6: [('20:00', '03:00')]},
+        collection_start='21:00', collection_end='06:00',
+    ),
+    'collection only': dict(collection_start='09:00', collection_end='12:00'),
+}
+
+
+# Function to filter the rows one by one
+def brute_force_filter(frame, window, use_end):
+    lab = lab_window_list(**window)
+    collection = None
+    if window.get('collection_start'):
+        collection = [(day, window['collection_start'], window['collection_end']) for day in range(7)]
+
+    moment_column = 'End_Time' if use_end else 'Start_Time'
+    keep = [row_fits(row, lab, collection, moment_column) for row in frame.to_dict('records')]
+    return frame[keep]
+
+
+def row_keys(frame):
+    return Counter(
+        repr((row['Stage'], row['Temperature'], row['Temp1'], row['Temp2'], row['Switch_Stage'],
+              row['Development_Time'], row['Start_Time'], row['End_Time']))
+        for row in frame.to_dict('records')
+    )
+
+
+@pytest.fixture
+def extended_table(interpolated_df):
+    df = interpolated_df(TEMPERATURES, max(STAGES), seed=4)
+    extended = calculate_switch_times(df, generate_temp_combinations(TEMPERATURES), STAGES)
+    return add_multi_switch_schedules(extended, df, TEMPERATURES, STAGES, max_switches=3)
+
+
+@pytest.mark.parametrize('window', WINDOWS.values(), ids=WINDOWS.keys())
+@pytest.mark.parametrize('use_end', [True, False], ids=['start time', 'desired time'])
+def test_filter_matches_per_row_check(extended_table, window, use_end):
+    if use_end:
+        results = calculate_end_times(extended_table, STAGES, TEMPERATURES, START)
+    else:
+        results = calculate_start_times(extended_table, STAGES, TEMPERATURES, DESIRED)
+    frame = results.to_frame()
+    assert (frame['Segments'].map(lambda segments: isinstance(segments, list) and len(segments) > 2)).any()
+
+    filtered = filter_results_by_timing(
+        results,
+        window.get('lab_days', []),
+        window.get('lab_start_time'),
+        window.get('lab_end_time'),
+        window.get('collection_start'),
+        window.get('collection_end'),
+        START if use_end else None,
+        None if use_end else DESIRED,
+        lab_hours=window.get('lab_hours'),
+    )
+
+    expected = brute_force_filter(frame, window, use_end)
+    assert 0 < len(expected) < len(frame)
+    assert filtered is not None
+    assert row_keys(filtered.to_frame()) == row_keys(expected)
@@ -0,0 +1,80 @@
+# trace_handler.py
+
+import os
+import queue
+import random
+import threading
+import uuid
+from metrics_handler import Counter
+
+# Trace mode: 'off' (default), 'sampled' (a TRACE_SAMPLE_RATE fraction of requests) or 'all'
+TRACE_MODE = os.environ.get('MEDAKA_TRACE_MODE', 'off')
+TRACE_SAMPLE_RATE = float(os.environ.get('MEDAKA_TRACE_SAMPLE_RATE', '0.01'))
+TRACE_DIR = os.environ.get(
+    'MEDAKA_TRACE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces')
+)
+# Tables waiting to be written; further tables are dropped while the queue is full
+TRACE_QUEUE_SIZE = int(os.environ.get('MEDAKA_TRACE_QUEUE_SIZE', '64'))
+
+_queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+_writer_lock = threading.Lock()
+_writer = None
+
+TRACE_TABLES_DROPPED = Counter(
+    'medaka_trace_tables_dropped_total', 'Trace tables not written, by reason.', 'reason'
+)
+
+
+class RequestTrace:
+    """
+    Collects the intermediate tables of one request under a unique request ID.
+    Calling trace(name, df) hands the table to the background writer, which
+    stores it as <TRACE_DIR>/<request_id>-<name>.csv.gz.
+    """
+    def __init__(self, request_id=None):
+        self.request_id = request_id or uuid.uuid4().hex
+
+    def __call__(self, name, df):
+        enqueue_table(os.path.join(TRACE_DIR, f'{self.request_id}-{name}.csv.gz'), df)
+
+
+# Function to decide whether a request is traced
+def new_request_trace():
+    """
+    Returns a RequestTrace for this request, or None when tracing is off or the
+    request was not sampled.
+    """
+    if TRACE_MODE == 'all' or (TRACE_MODE == 'sampled' and random.random() < TRACE_SAMPLE_RATE):
+        start_trace_writer()
+        return RequestTrace()
+    return None
+
+
+# Function to queue a table for writing without blocking the request
+def enqueue_table(path, df):
+    try:
+        _queue.put_nowait((path, df))
+    except queue.Full:
+        TRACE_TABLES_DROPPED.inc('queue_full')
+
+
+def write_loop():
+    while True:
+        path, df = _queue.get()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_csv(path, index=False, compression='gzip')
+        except Exception as e:
+            print(f"Writing trace {path} failed: {e}")
+        finally:
+            _queue.task_done()
+
+
+# Function to start the background writer once per process
+def start_trace_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=write_loop, name='trace-writer', daemon=True)
+            _writer.start()
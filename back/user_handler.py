@@ -2,6 +2,9 @@
 
 from datetime import datetime, time
 
+# Candidate starts one earliest-start search may scan (60 days at 10-minute steps)
+MAX_SEARCH_STARTS = 60 * 24 * 6
+
 def handle_and_validate_user_input(input_data):
     # Helper functions for validation and parsing
 
@@ -31,6 +34,28 @@ def handle_and_validate_user_input(input_data):
             return lab_days
         return []  # Return empty list if lab_days is invalid
 
+    def validate_max_switches(max_switches):
+        if max_switches is None:
+            return 1
+        if isinstance(max_switches, int) and not isinstance(max_switches, bool) and 1 <= max_switches <= 3:
+            return max_switches
+        raise ValueError("Max switches should be an integer between 1 and 3.")
+
+    def validate_graph_format(graph_format):
+        if graph_format is None:
+            return 'records'
+        if graph_format in ('records', 'columnar'):
+            return graph_format
+        raise ValueError("Graph format should be 'records' or 'columnar'.")
+
+    # Function to validate an optional bounded integer such as the search range
+    def validate_bounded_int(value, default, minimum, maximum, message):
+        if value is None:
+            return default
+        if isinstance(value, int) and not isinstance(value, bool) and minimum <= value <= maximum:
+            return value
+        raise ValueError(message)
+
     # Function to validate lab start and end times
     def validate_time_string(time_str):
         try:
@@ -40,6 +65,33 @@ def handle_and_validate_user_input(input_data):
         except ValueError:
             return None  # Return None if time_str is invalid
 
+    # Function to validate per-weekday lab hours: {weekday: [[start, end], ...]}
+    def validate_lab_hours(lab_hours):
+        if lab_hours is None:
+            return None
+        error = ValueError("Lab hours should map weekdays (0-6) to lists of [start, end] times (HH:MM).")
+        if not isinstance(lab_hours, dict):
+            raise error
+        validated = {}
+        for weekday, ranges in lab_hours.items():
+            try:
+                weekday = int(weekday)
+            except (TypeError, ValueError):
+                raise error
+            if not 0 <= weekday <= 6 or not isinstance(ranges, list):
+                raise error
+            windows = []
+            for window in ranges:
+                if not isinstance(window, (list, tuple)) or len(window) != 2:
+                    raise error
+                start, end = (validate_time_string(value) if isinstance(value, str) else None for value in window)
+                if start is None or end is None:
+                    raise error
+                windows.append((start, end))
+            if windows:
+                validated[weekday] = sorted(windows)
+        return validated or None
+
     # Validating and Sanitizing User Input
 
     required_species = validate_species(input_data.get('required_species'))
@@ -60,6 +112,25 @@ def handle_and_validate_user_input(input_data):
     lab_start_time = validate_time_string(input_data.get('lab_start_time'))
     lab_end_time = validate_time_string(input_data.get('lab_end_time'))
 
+    lab_hours = validate_lab_hours(input_data.get('lab_hours'))
+
+    max_switches = validate_max_switches(input_data.get('max_switches'))
+
+    # Earliest-start search: scan search_days from search_start in steps of search_step_minutes
+    search_start = validate_datetime(input_data.get('search_start'))
+    search_days = validate_bounded_int(
+        input_data.get('search_days'), 14, 1, 60, "Search days should be an integer between 1 and 60."
+    )
+    search_step_minutes = validate_bounded_int(
+        input_data.get('search_step_minutes'), 15, 1, 1440, "Search step should be an integer between 1 and 1440 minutes."
+    )
+    if search_start and search_days * 24 * 60 // search_step_minutes > MAX_SEARCH_STARTS:
+        raise ValueError(
+            f"The search range allows at most {MAX_SEARCH_STARTS} candidate starts; use fewer days or a larger step."
+        )
+
+    graph_format = validate_graph_format(input_data.get('graph_format'))
+
     return {
         'required_species': required_species,
         'required_stages': required_stages,
@@ -70,5 +141,11 @@ def handle_and_validate_user_input(input_data):
         'collection_end': collection_end,
         'lab_days': lab_days,
         'lab_start_time': lab_start_time,
-        'lab_end_time': lab_end_time
+        'lab_end_time': lab_end_time,
+        'lab_hours': lab_hours,
+        'max_switches': max_switches,
+        'search_start': search_start,
+        'search_days': search_days,
+        'search_step_minutes': search_step_minutes,
+        'graph_format': graph_format
     }
@@ -1,30 +1,19 @@
-import sqlite3
+import os
+import sys
 import json
 
-# Step 1: Connect to SQLite database (this will create the file if it doesn't exist)
-conn = sqlite3.connect('medaka_development.db')
-cursor = conn.cursor()
+# Reuse the backend's connection manager and bulk insert
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'back'))
+from db_handler import configure_database, migrate_database, add_records
 
-# Step 2: Create the table (only if it doesn't already exist)
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS development_times (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        species TEXT NOT NULL,
-        temperature REAL NOT NULL,
-        stage INTEGER NOT NULL,
-        development_time_hpf REAL NOT NULL
-    );
-''')
+# Step 1: Connect to SQLite database (this will create the file if it doesn't exist)
+configure_database('medaka_development.db')
 
-# Step 3: Insert data from JSON file into the database
-def insert_data(species, temperature, stage, development_time_hpf):
-    cursor.execute('''
-        INSERT INTO development_times (species, temperature, stage, development_time_hpf)
-        VALUES (?, ?, ?, ?)
-    ''', (species, temperature, stage, development_time_hpf))
-    conn.commit()
+# Step 2: Create the table, indexes, version triggers and the interpolated grid table (only if missing)
+migrate_database()
 
-# Step 4: Load data from JSON file and insert it into the database
+# Step 3: Collect the records from the JSON file
+records = []
 with open('Development_Times.json', 'r') as file:
     data = json.load(file)
     for temp_data in data['temperatures']:
@@ -33,7 +22,8 @@ with open('Development_Times.json', 'r') as file:
             stage = int(stage_data['stage'])
             for development_time in stage_data['times']:
                 # Assuming species is static for now, you can modify this if species data is in JSON
-                insert_data('Oryzias latipes', temperature, stage, development_time)
+                records.append(('Oryzias latipes', temperature, stage, development_time))
 
-# Close the connection when done
-conn.close()
+# Step 4: Insert all records in a single transaction (nothing is written if a record is invalid)
+inserted = add_records(records)
+print(f"Inserted {inserted} records.")